@@ -4,6 +4,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 import duckdb
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 # Set page config at the very beginning
@@ -20,11 +21,26 @@ def get_duckdb_connection():
 
 conn = get_duckdb_connection()
 
+# Queries run concurrently, each on its own cursor of the cached connection
+@st.cache_resource
+def get_query_executor():
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="dashboard-query")
+
 # Load data from DuckDB
 @st.cache_data
-def load_data(query):
+def fetch_data(query, params=None):
+    """Run a (parameterized) query and fetch only its result rows, via Arrow."""
+    return conn.cursor().execute(query, params or []).fetch_arrow_table().to_pandas()
+
+def submit_queries(queries, params=None):
+    """Start loading the data of each panel in the background."""
+    executor = get_query_executor()
+    return {key: executor.submit(fetch_data, query, params) for key, query in queries.items()}
+
+def load_data(future):
+    """Wait for the data of a panel; Streamlit calls stay in the script thread."""
     try:
-        df = conn.execute(query).fetchdf()
+        df = future.result()
         if df.empty:
             st.warning(f"Query executed but returned no data. Check if the table is empty.")
         return df
@@ -34,7 +50,6 @@ def load_data(query):
 
 # Define queries
 queries = {
-    "revenue_over_time": "SELECT * FROM main_gold.mart_revenue_over_time;",
     "top_selling_products": "SELECT * FROM main_gold.mart_top_selling_products;",
     "sales_by_category": "SELECT * FROM main_gold.mart_sales_by_category;",
     "customer_demographics": "SELECT * FROM main_gold.mart_customer_demographics;",
@@ -45,12 +60,48 @@ queries = {
     "sales_by_state": "SELECT * FROM main_gold.mart_sales_by_state;",
 }
 
-# Load all required tables
-data = {key: load_data(query) for key, query in queries.items()}
+# Queries over the selected date range, filtered and grouped by DuckDB; parameters are (start_date, end_date)
+date_range_queries = {
+    "sales_overview": """
+        SELECT
+            SUM(total_revenue) AS total_revenue,
+            COUNT(DISTINCT date) AS total_orders,
+            ARG_MIN(total_revenue, date) AS first_revenue,
+            ARG_MAX(total_revenue, date) AS last_revenue
+        FROM main_gold.mart_revenue_over_time
+        WHERE date BETWEEN ? AND ?;
+    """,
+    "revenue_over_time": """
+        SELECT date, total_revenue
+        FROM main_gold.mart_revenue_over_time
+        WHERE date BETWEEN ? AND ?
+        ORDER BY date;
+    """,
+    "monthly_revenue": """
+        SELECT DATE_TRUNC('month', date) AS date, SUM(total_revenue) AS total_revenue
+        FROM main_gold.mart_revenue_over_time
+        WHERE date BETWEEN ? AND ?
+        GROUP BY 1
+        ORDER BY 1;
+    """,
+    "day_of_week_revenue": """
+        SELECT DAYNAME(date) AS day_of_week, AVG(total_revenue) AS total_revenue
+        FROM main_gold.mart_revenue_over_time
+        WHERE date BETWEEN ? AND ?
+        GROUP BY DAYNAME(date), ISODOW(date)
+        ORDER BY ISODOW(date);
+    """,
+}
+
+# Start loading all panels; each section renders as soon as its own data is ready
+data = submit_queries(queries)
 
 # Set min_date and max_date from revenue_over_time
-min_date = data["revenue_over_time"]['date'].min()
-max_date = data["revenue_over_time"]['date'].max()
+date_bounds = load_data(submit_queries(
+    {"date_bounds": "SELECT MIN(date) AS min_date, MAX(date) AS max_date FROM main_gold.mart_revenue_over_time;"}
+)["date_bounds"])
+min_date = date_bounds['min_date'].iloc[0]
+max_date = date_bounds['max_date'].iloc[0]
 
 st.title("The Look E-commerce Dashboard")
 
@@ -61,24 +112,19 @@ with col1:
 with col2:
     end_date = st.date_input("End Date", max_date)
 
-# Convert start_date and end_date to datetime
-start_date = pd.to_datetime(start_date)
-end_date = pd.to_datetime(end_date)
-
 # Filter data based on date range
-filtered_revenue_over_time = data["revenue_over_time"][
-    (data["revenue_over_time"]['date'] >= start_date) & 
-    (data["revenue_over_time"]['date'] <= end_date)
-]
+date_range_data = submit_queries(date_range_queries, (start_date, end_date))
+filtered_revenue_over_time = load_data(date_range_data["revenue_over_time"])
 
 # Sales Overview
 st.header("Sales Overview")
 col1, col2, col3, col4 = st.columns(4)
 
-total_revenue = filtered_revenue_over_time['total_revenue'].sum()
-total_orders = len(filtered_revenue_over_time['date'].unique())
+sales_overview = load_data(date_range_data["sales_overview"]).iloc[0]
+total_revenue = sales_overview['total_revenue']
+total_orders = sales_overview['total_orders']
 average_order_value = total_revenue / total_orders if total_orders > 0 else 0
-revenue_growth = ((filtered_revenue_over_time['total_revenue'].iloc[-1] - filtered_revenue_over_time['total_revenue'].iloc[0]) / filtered_revenue_over_time['total_revenue'].iloc[0]) * 100
+revenue_growth = ((sales_overview['last_revenue'] - sales_overview['first_revenue']) / sales_overview['first_revenue']) * 100
 
 col1.metric("Total Revenue", f"${total_revenue:,.2f}")
 col2.metric("Total Orders", f"{total_orders:,}")
@@ -97,13 +143,13 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Top selling products
-    fig = px.bar(data["top_selling_products"], x='product_name', y='total_items_sold', title="Top 10 Selling Products")
+    fig = px.bar(load_data(data["top_selling_products"]), x='product_name', y='total_items_sold', title="Top 10 Selling Products")
     fig.update_layout(xaxis_title="Product", yaxis_title="Items Sold")
     st.plotly_chart(fig, use_container_width=True)
 
 with col2:
     # Sales by category
-    fig = px.pie(data["sales_by_category"], values='total_sales', names='category', title="Sales by Category")
+    fig = px.pie(load_data(data["sales_by_category"]), values='total_sales', names='category', title="Sales by Category")
     st.plotly_chart(fig, use_container_width=True)
 
 # Customer Analysis
@@ -113,12 +159,12 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Customer demographics
-    fig = px.pie(data["customer_demographics"], values='user_count', names='gender', title="Customer Gender Distribution")
+    fig = px.pie(load_data(data["customer_demographics"]), values='user_count', names='gender', title="Customer Gender Distribution")
     st.plotly_chart(fig, use_container_width=True)
 
 with col2:
     # Top customers by revenue
-    fig = px.bar(data["top_customers"], x='user_id', y='total_revenue', title="Top 10 Customers by Revenue")
+    fig = px.bar(load_data(data["top_customers"]), x='user_id', y='total_revenue', title="Top 10 Customers by Revenue")
     fig.update_layout(xaxis_title="User ID", yaxis_title="Total Revenue ($)")
     st.plotly_chart(fig, use_container_width=True)
 
@@ -129,12 +175,12 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Order status distribution
-    fig = px.pie(data["order_status_distribution"], values='order_count', names='status', title="Order Status Distribution")
+    fig = px.pie(load_data(data["order_status_distribution"]), values='order_count', names='status', title="Order Status Distribution")
     st.plotly_chart(fig, use_container_width=True)
 
 with col2:
     # Average time to ship
-    avg_ship_time = data["average_time_to_ship"]['avg_ship_time'].iloc[0]
+    avg_ship_time = load_data(data["average_time_to_ship"])['avg_ship_time'].iloc[0]
     fig = go.Figure(go.Indicator(
         mode = "gauge+number",
         value = avg_ship_time,
@@ -154,14 +200,14 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Sales by country
-    fig = px.choropleth(data["sales_by_country"], locations='country', locationmode='country names', 
+    fig = px.choropleth(load_data(data["sales_by_country"]), locations='country', locationmode='country names', 
                         color='total_sales', hover_name='country', color_continuous_scale="Viridis",
                         title="Sales by Country")
     st.plotly_chart(fig, use_container_width=True)
 
 with col2:
     # Sales by state (assuming US states)
-    fig = px.choropleth(data["sales_by_state"], locations='state', locationmode='USA-states', 
+    fig = px.choropleth(load_data(data["sales_by_state"]), locations='state', locationmode='USA-states', 
                         color='total_sales', hover_name='state', scope="usa", color_continuous_scale="Viridis",
                         title="Sales by State (US)")
     st.plotly_chart(fig, use_container_width=True)
@@ -173,18 +219,14 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Monthly revenue trend
-    monthly_revenue = filtered_revenue_over_time.set_index('date').resample('M')['total_revenue'].sum().reset_index()
+    monthly_revenue = load_data(date_range_data["monthly_revenue"])
     fig = px.line(monthly_revenue, x='date', y='total_revenue', title="Monthly Revenue Trend")
     fig.update_layout(xaxis_title="Month", yaxis_title="Revenue ($)")
     st.plotly_chart(fig, use_container_width=True)
 
 with col2:
     # Day of week analysis
-    filtered_revenue_over_time['day_of_week'] = filtered_revenue_over_time['date'].dt.day_name()
-    day_of_week_revenue = filtered_revenue_over_time.groupby('day_of_week')['total_revenue'].mean().reset_index()
-    day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    day_of_week_revenue['day_of_week'] = pd.Categorical(day_of_week_revenue['day_of_week'], categories=day_order, ordered=True)
-    day_of_week_revenue = day_of_week_revenue.sort_values('day_of_week')
+    day_of_week_revenue = load_data(date_range_data["day_of_week_revenue"])
     fig = px.bar(day_of_week_revenue, x='day_of_week', y='total_revenue', title="Average Daily Revenue by Day of Week")
     fig.update_layout(xaxis_title="Day of Week", yaxis_title="Average Revenue ($)")
     st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,203 @@
+""" Offline benchmarks of the ingestion stages on synthetic thelook data """
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import duckdb
+import fire
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from bigquery import build_ecommerce_query, get_bigquery_results, stream_bigquery_batches
+from duck import copy_table_to_parquet, create_table_from_pyarrow_tables
+from metrics import peak_rss_bytes
+from models import EcommerceJobParameters, table_partition_columns, validate_table
+from synthetic import SyntheticBigQueryClient, generate_table
+
+STAGES = ["extract", "extract_stream", "validate", "load", "sink_csv", "sink_parquet"]
+
+
+class BenchmarkParameters(BaseModel):
+    rows: int = 100_000
+    table_names: List[str] = Field(default_factory=lambda: ["events", "order_items"])
+    stages: List[str] = Field(default_factory=lambda: list(STAGES))
+    batch_rows: int = 1_000_000
+    output: Optional[str] = None  # where to write the JSON results
+    baseline: Optional[str] = None  # previous JSON results to compare against
+
+
+class BenchmarkResult(BaseModel):
+    table: str
+    stage: str
+    rows: int
+    seconds: float
+    rows_per_second: float
+    setup_peak_rss_bytes: int
+    peak_rss_bytes: int
+
+
+def run_stage(stage: str, table_name: str, rows: int, batch_rows: int) -> BenchmarkResult:
+    """
+    Run one stage of the pipeline on synthetic data and measure it.
+
+    Meant to run in a fresh process, so that peak RSS only reflects the setup
+    (data generation) and the stage itself.
+
+    Args:
+        stage (str): One of ``STAGES``.
+        table_name (str): The thelook table to generate.
+        rows (int): Number of rows to generate.
+        batch_rows (int): Rows per record batch for streamed extraction.
+
+    Returns:
+        BenchmarkResult: Timing and memory of the stage.
+    """
+    with tempfile.TemporaryDirectory(prefix="ingestion-benchmark-") as workdir:
+        return _run_stage(stage, table_name, rows, batch_rows, workdir)
+
+
+def _run_stage(stage: str, table_name: str, rows: int, batch_rows: int, workdir: str) -> BenchmarkResult:
+    conn = duckdb.connect()
+    params = EcommerceJobParameters(
+        table_names=[table_name], gcp_project="benchmark", s3_path=None, aws_profile=None
+    )
+    client = SyntheticBigQueryClient(rows, batch_rows)
+    query = build_ecommerce_query(params)[0]
+    table = None
+    if stage not in ("extract", "extract_stream"):
+        table = generate_table(table_name, rows)
+    if stage in ("sink_csv", "sink_parquet"):
+        create_table_from_pyarrow_tables(conn, {table_name: table})
+        table = None
+    setup_peak = peak_rss_bytes()
+
+    start_time = time.perf_counter()
+    if stage == "extract":
+        get_bigquery_results([query], [table_name], client, max_workers=1)
+    elif stage == "extract_stream":
+        for _ in stream_bigquery_batches(query, table_name, client, batch_rows=batch_rows):
+            pass
+    elif stage == "validate":
+        validate_table(table, table_name)
+    elif stage == "load":
+        create_table_from_pyarrow_tables(conn, {table_name: table})
+    elif stage == "sink_csv":
+        conn.execute(f"COPY {table_name} TO '{os.path.join(workdir, table_name)}.csv'")
+    elif stage == "sink_parquet":
+        copy_table_to_parquet(
+            conn,
+            table_name,
+            workdir,
+            partitioned=True,
+            partition_column=table_partition_columns.get(table_name),
+        )
+    else:
+        raise ValueError(f"Unknown benchmark stage: {stage}")
+    seconds = time.perf_counter() - start_time
+
+    return BenchmarkResult(
+        table=table_name,
+        stage=stage,
+        rows=rows,
+        seconds=seconds,
+        rows_per_second=rows / seconds if seconds else float("inf"),
+        setup_peak_rss_bytes=setup_peak,
+        peak_rss_bytes=peak_rss_bytes(),
+    )
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[BenchmarkResult], baseline_path: str):
+    """Log the rows/sec and peak RSS change of each result against a previous run."""
+    with open(baseline_path) as f:
+        baseline = {
+            (r["table"], r["stage"], r["rows"]): r for r in json.load(f)["results"]
+        }
+    for result in results:
+        previous = baseline.get((result.table, result.stage, result.rows))
+        if previous is None:
+            continue
+        speedup = result.rows_per_second / previous["rows_per_second"] - 1
+        memory = result.peak_rss_bytes / previous["peak_rss_bytes"] - 1
+        logger.info(
+            f"{result.table:<20} {result.stage:<15} rows/s {speedup:+.1%}  peak RSS {memory:+.1%}"
+        )
+
+
+def run_benchmarks(params: BenchmarkParameters) -> List[BenchmarkResult]:
+    """
+    Benchmark every requested stage and table, each in a fresh process.
+
+    Args:
+        params (BenchmarkParameters): The benchmark parameters.
+
+    Returns:
+        List[BenchmarkResult]: One result per table and stage.
+    """
+    results = []
+    for table_name in params.table_names:
+        for stage in params.stages:
+            # logger.remove keeps the worker quiet so the results stay readable
+            with ProcessPoolExecutor(max_workers=1, initializer=logger.remove) as executor:
+                result = executor.submit(
+                    run_stage, stage, table_name, params.rows, params.batch_rows
+                ).result()
+            logger.info(
+                f"{result.table:<20} {result.stage:<15} {result.seconds:8.2f}s "
+                f"{result.rows_per_second:14,.0f} rows/s  peak RSS {result.peak_rss_bytes / 2**20:8.0f} MiB"
+            )
+            results.append(result)
+
+    if params.output:
+        with open(params.output, "w") as f:
+            json.dump(
+                {
+                    "commit": _git_commit(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "cpu_count": os.cpu_count(),
+                    "duckdb": duckdb.__version__,
+                    "params": params.model_dump(),
+                    "results": [result.model_dump() for result in results],
+                },
+                f,
+                indent=2,
+            )
+        logger.info(f"Benchmark results written to {params.output}")
+    if params.baseline:
+        compare(results, params.baseline)
+    return results
+
+
+def main(params: BenchmarkParameters):
+    """
+    Runs the offline benchmark suite.
+
+    Args:
+        params (BenchmarkParameters): The benchmark parameters.
+
+    Returns:
+        None
+    """
+    start_time = time.time()
+    run_benchmarks(params)
+    logger.info(f"Benchmarks completed in {time.time() - start_time:.2f} seconds.")
+
+
+if __name__ == "__main__":
+    fire.Fire(lambda **kwargs: main(BenchmarkParameters(
+        **{k: v.split(',') if k in ('table_names', 'stages') and isinstance(v, str) else v for k, v in kwargs.items()}
+    )))
@@ -1,11 +1,22 @@
-import os
+import json
 from google.cloud import bigquery
-from google.oauth2 import service_account
-from google.auth.exceptions import DefaultCredentialsError
+from google.cloud import bigquery_storage
 from loguru import logger
-from typing import List
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import time
-from models import EcommerceJobParameters
+from models import (
+    EcommerceJobParameters,
+    QueryConfig,
+    table_model_mapping,
+    table_partition_columns,
+    table_primary_keys,
+    table_watermark_columns,
+)
+from metrics import record, track
+from cache import ResultCache
+from clients import get_bigquery_client, get_bigquery_storage_client  # re-exported
 import pandas as pd
 import pyarrow as pa
 
@@ -13,7 +24,9 @@ ECOMMERCE_PUBLIC_DATASET = "bigquery-public-data.thelook_ecommerce"
 
 
 def build_ecommerce_query(
-    params: EcommerceJobParameters, ecom_public_dataset: str = ECOMMERCE_PUBLIC_DATASET
+    params: EcommerceJobParameters,
+    ecom_public_dataset: str = ECOMMERCE_PUBLIC_DATASET,
+    watermarks: Optional[Dict[str, dict]] = None,
 ) -> List[str]:
     """
     Generate SQL queries to query specific tables based on provided parameters.
@@ -21,58 +34,281 @@ def build_ecommerce_query(
     Args:
         params (EcommerceJobParameters): The parameters for the Ecommerce job.
         ecom_public_dataset (str, optional): The name of the Ecommerce public dataset. Defaults to ECOMMERCE_PUBLIC_DATASET.
+        watermarks (Dict[str, dict], optional): Per-table high-water marks. When given, tables that have one
+            only select rows above it. Defaults to None.
 
     Returns:
         List[str]: A list of SQL queries.
 
     """
+    watermarks = watermarks or {}
+    config = load_query_config(params)
     queries = []
     for table_name in params.table_names:
         if table_name:
-            query = f"SELECT * FROM `{ecom_public_dataset}.{table_name}`"
+            columns = table_columns(params, table_name, config)
+            select = ", ".join(columns) if columns else "*"
+            query = f"SELECT {select} FROM `{ecom_public_dataset}.{table_name}`"
+            predicates = []
+            if table_name in config.filters:
+                predicates.append(f"({config.filters[table_name]})")
+            if table_name in watermarks:
+                predicates.append(_watermark_predicate(watermarks[table_name]))
+            if predicates:
+                query += f" WHERE {' AND '.join(predicates)}"
             queries.append(query)
         else:
             logger.warning(f"Invalid table name provided: {table_name}")
     return queries
 
 
-def get_bigquery_client(project_name: str) -> bigquery.Client:
+def load_query_config(params: EcommerceJobParameters) -> QueryConfig:
     """
-    Get BigQuery client.
+    Collect the column projections and filters to push down to BigQuery.
+
+    Entries passed as job parameters take precedence over those read from
+    ``params.query_config``.
 
     Args:
-        project_name (str): The name of the BigQuery project.
+        params (EcommerceJobParameters): The parameters for the Ecommerce job.
 
     Returns:
-        bigquery.Client: The BigQuery client object.
+        QueryConfig: The merged configuration.
+    """
+    config = QueryConfig()
+    if params.query_config:
+        with open(params.query_config) as f:
+            config = QueryConfig(**json.load(f))
+    config.columns.update(params.columns or {})
+    config.filters.update(params.filters or {})
+    return config
 
-    Raises:
-        EnvironmentError: If no valid credentials are found for BigQuery authentication.
-        DefaultCredentialsError: If there is an error with the default credentials.
 
+def table_columns(
+    params: EcommerceJobParameters,
+    table_name: str,
+    config: Optional[QueryConfig] = None,
+) -> Optional[List[str]]:
     """
-    try:
-        service_account_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
-
-        if service_account_path:
-            credentials = service_account.Credentials.from_service_account_file(
-                service_account_path
-            )
-            bigquery_client = bigquery.Client(
-                project=project_name, credentials=credentials
-            )
-            return bigquery_client
-
-        raise EnvironmentError(
-            "No valid credentials found for BigQuery authentication."
-        )
+    Resolve the columns selected for a table.
+
+    Explicit column lists win over ``params.model_columns``. The watermark,
+    partition and primary key columns are always kept so incremental and
+    partitioned runs keep working on projected tables.
+
+    Args:
+        params (EcommerceJobParameters): The parameters for the Ecommerce job.
+        table_name (str): The name of the table.
+        config (QueryConfig, optional): A config already loaded with ``load_query_config``. Defaults to None.
+
+    Returns:
+        Optional[List[str]]: The columns to select, or None to select all of them.
+    """
+    config = config or load_query_config(params)
+    if table_name in config.columns:
+        columns = list(config.columns[table_name])
+    elif params.model_columns and table_name in table_model_mapping:
+        columns = list(table_model_mapping[table_name].model_fields)
+    else:
+        return None
+
+    for column in (
+        table_primary_keys.get(table_name),
+        table_watermark_columns.get(table_name),
+        table_partition_columns.get(table_name),
+    ):
+        if column and column not in columns:
+            columns.append(column)
+    return columns
+
+
+def _watermark_predicate(watermark: dict) -> str:
+    """Build the filter selecting rows above a watermark."""
+    value = watermark["value"]
+    if isinstance(value, str):
+        value = f'TIMESTAMP("{value}")'
+    return f"{watermark['column']} > {value}"
+
 
-    except DefaultCredentialsError as creds_error:
-        raise creds_error
+def _download_arrow(
+    query_job: bigquery.QueryJob,
+    table_name: str,
+    submitted_at: float,
+    bqstorage_client: Optional[bigquery_storage.BigQueryReadClient] = None,
+) -> pa.Table:
+    """Wait for a submitted query job and download its result as a PyArrow Table."""
+    start_time = time.time()
+    with track("extract", table_name) as metrics:
+        # Without a shared Storage client the library creates one per download
+        table = query_job.to_arrow(bqstorage_client=bqstorage_client)  # Fetch the results as a PyArrow Table
+        metrics.rows, metrics.bytes = table.num_rows, table.nbytes
+        metrics.batches = len(table.to_batches())
+    finished_at = time.time()
+    logger.info(
+        f"Query for {table_name} executed and data loaded in {finished_at - submitted_at:.2f} seconds "
+        f"(download {finished_at - start_time:.2f} seconds, {table.num_rows} rows)"
+    )
+    return table
+
+
+def shard_key_range(
+    bigquery_client: bigquery.Client, query: str, shard_column: str
+) -> Optional[Tuple[int, int]]:
+    """
+    Read the smallest and largest shard key selected by a query.
+
+    Args:
+        bigquery_client (bigquery.Client): The BigQuery client object.
+        query (str): A query as built by ``build_ecommerce_query``.
+        shard_column (str): An integer column to shard on, usually the primary key.
+
+    Returns:
+        Optional[Tuple[int, int]]: The key range, or None if the query selects no keys.
+    """
+    bounds = bigquery_client.query(
+        f"SELECT MIN({shard_column}) AS lo, MAX({shard_column}) AS hi FROM ({query})"
+    ).to_arrow()
+    lo, hi = bounds["lo"][0].as_py(), bounds["hi"][0].as_py()
+    if lo is None:
+        return None
+    return lo, hi
+
+
+def shard_query(
+    query: str, shard_column: str, num_shards: int, key_range: Optional[Tuple[int, int]]
+) -> List[str]:
+    """
+    Split a query into contiguous ranges of ``shard_column``.
+
+    The ``key_range`` (see ``shard_key_range``) is cut into ``num_shards``
+    ranges of equal width. The first shard is open below and also takes the
+    NULL keys, and the last is open above, so rows inserted after the range
+    was read are still selected. On a table clustered on the key, BigQuery
+    prunes the blocks outside each range. Otherwise every shard scans the
+    selected columns of the whole table, and the bytes billed grow
+    ``num_shards`` times.
+
+    Args:
+        query (str): A query as built by ``build_ecommerce_query``.
+        shard_column (str): An integer column to shard on, usually the primary key.
+        num_shards (int): The number of shards.
+        key_range (Tuple[int, int], optional): The smallest and largest key, or None for no keys.
+
+    Returns:
+        List[str]: One query per shard. Each row of ``query`` matches exactly one
+        shard, but the shards run as separate jobs, so rows written or updated
+        between those jobs can be missed or selected twice.
+    """
+    if num_shards <= 1 or key_range is None:
+        return [query]
+    lo, hi = key_range
+    num_shards = min(num_shards, hi - lo + 1)
+    if num_shards <= 1:
+        return [query]
+    width = -(-(hi - lo + 1) // num_shards)
+    bounds = [lo + width * shard for shard in range(1, num_shards)]
+    predicates = [f"({shard_column} < {bounds[0]} OR {shard_column} IS NULL)"]
+    predicates += [
+        f"{shard_column} >= {low} AND {shard_column} < {high}" for low, high in zip(bounds, bounds[1:])
+    ]
+    predicates.append(f"{shard_column} >= {bounds[-1]}")
+    joiner = " AND " if " WHERE " in query else " WHERE "
+    return [f"{query}{joiner}{predicate}" for predicate in predicates]
+
+
+def iter_bigquery_results(
+    queries: List[str],
+    table_names: List[str],
+    bigquery_client: bigquery.Client,
+    max_workers: int = 4,
+    shards: Optional[Dict[str, int]] = None,
+    bqstorage_client: Optional[bigquery_storage.BigQueryReadClient] = None,
+    cache: Optional[ResultCache] = None,
+) -> Iterator[Tuple[str, pa.Table]]:
+    """
+    Submits all BigQuery queries up front and yields their results as they complete.
+
+    Query jobs run concurrently on the BigQuery side; result downloads are
+    spread over a bounded thread pool. Sharded tables are queried as several
+    contiguous key ranges, read with one MIN/MAX query per table, whose
+    downloads share that pool, and are yielded once every shard has arrived.
+
+    Args:
+        queries (List[str]): A list of BigQuery queries to execute.
+        table_names (List[str]): A list of table names corresponding to each query.
+        bigquery_client (bigquery.Client): The BigQuery client object used to execute the queries.
+        max_workers (int, optional): Maximum number of concurrent result downloads. Defaults to 4.
+        shards (Dict[str, int], optional): Number of primary key shards per table. Defaults to None.
+        bqstorage_client (bigquery_storage.BigQueryReadClient, optional): Storage Read API client shared
+            by all downloads. Defaults to None.
+        cache (ResultCache, optional): Serves repeated queries from disk and stores new results. Defaults to None.
+
+    Yields:
+        Tuple[str, pa.Table]: The table name and its query result, in completion order.
+    """
+    shards = shards or {}
+    submitted = []
+    expected = {}
+    cached_queries, hits = {}, []
+    for query, table_name in zip(queries, table_names):
+        if cache is not None:
+            with track("extract:cache", table_name) as metrics:
+                table = cache.get(query, table_name)
+                if table is not None:
+                    metrics.rows, metrics.bytes = table.num_rows, table.nbytes
+            if table is not None:
+                hits.append((table_name, table))
+                continue
+            cached_queries[table_name] = query
+        shard_queries = [query]
+        if shards.get(table_name, 1) > 1:
+            shard_column = table_primary_keys[table_name]
+            key_range = shard_key_range(bigquery_client, query, shard_column)
+            shard_queries = shard_query(query, shard_column, shards[table_name], key_range)
+        expected[table_name] = len(shard_queries)
+        for shard, shard_q in enumerate(shard_queries):
+            label = table_name if len(shard_queries) == 1 else f"{table_name}[{shard}/{len(shard_queries)}]"
+            try:
+                logger.info(f"Running query for table: {label}")
+                submitted.append((table_name, label, bigquery_client.query(shard_q), time.time()))  # Start the query job
+            except Exception as e:
+                logger.error(f"Error running query for {label}: {e}")
+                raise
+    # Cached tables are handed over once the remaining query jobs are running
+    yield from hits
+
+    parts = defaultdict(list)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(_download_arrow, query_job, label, submitted_at, bqstorage_client): table_name
+            for table_name, label, query_job, submitted_at in submitted
+        }
+        for future in as_completed(futures):
+            table_name = futures[future]
+            try:
+                table = future.result()
+            except Exception as e:
+                logger.error(f"Error running query for {table_name}: {e}")
+                for pending in futures:
+                    pending.cancel()
+                raise
+            parts[table_name].append(table)
+            if len(parts[table_name]) == expected[table_name]:
+                tables = parts.pop(table_name)
+                table = tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+                if table_name in cached_queries:
+                    cache.put(cached_queries[table_name], table)
+                yield table_name, table
 
 
 def get_bigquery_results(
-    queries: List[str], table_names: List[str], bigquery_client: bigquery.Client
+    queries: List[str],
+    table_names: List[str],
+    bigquery_client: bigquery.Client,
+    max_workers: int = 4,
+    shards: Optional[Dict[str, int]] = None,
+    bqstorage_client: Optional[bigquery_storage.BigQueryReadClient] = None,
+    cache: Optional[ResultCache] = None,
 ) -> dict:
     """
     Executes a list of BigQuery queries and returns the results as a dictionary of PyArrow Tables.
@@ -81,23 +317,94 @@ def get_bigquery_results(
         queries (List[str]): A list of BigQuery queries to execute.
         table_names (List[str]): A list of table names corresponding to each query.
         bigquery_client (bigquery.Client): The BigQuery client object used to execute the queries.
+        max_workers (int, optional): Maximum number of concurrent result downloads. Defaults to 4.
+        shards (Dict[str, int], optional): Number of primary key shards per table. Defaults to None.
+        bqstorage_client (bigquery_storage.BigQueryReadClient, optional): Storage Read API client shared
+            by all downloads. Defaults to None.
+        cache (ResultCache, optional): Serves repeated queries from disk and stores new results. Defaults to None.
 
     Returns:
         dict: A dictionary where the keys are the table names and the values are the query results as PyArrow Tables.
     """
-    tables = {}
-    for query, table_name in zip(queries, table_names):
-        try:
-            logger.info(f"Running query for table: {table_name}")
-            start_time = time.time()
-            query_job = bigquery_client.query(query)  # Start the query job
-            table = query_job.to_arrow()  # Fetch the results as a PyArrow Table
-            elapsed_time = time.time() - start_time
-            logger.info(
-                f"Query for {table_name} executed and data loaded in {elapsed_time:.2f} seconds"
-            )
-            tables[table_name] = table
-        except Exception as e:
-            logger.error(f"Error running query for {table_name}: {e}")
-            raise
-    return tables
+    start_time = time.time()
+    results = dict(
+        iter_bigquery_results(
+            queries, table_names, bigquery_client, max_workers, shards, bqstorage_client, cache
+        )
+    )
+    logger.info(
+        f"Extracted {len(results)} tables in {time.time() - start_time:.2f} seconds"
+    )
+    # Keep the requested table order regardless of completion order
+    return {table_name: results[table_name] for table_name in table_names if table_name in results}
+
+
+def _rebatch(batches: Iterable[pa.RecordBatch], batch_rows: int) -> Iterator[pa.RecordBatch]:
+    """Re-chunk a stream of record batches into batches of exactly ``batch_rows`` rows (the last one may be smaller)."""
+    pending, pending_rows, empty_batch, emitted = [], 0, None, False
+    for batch in batches:
+        if batch.num_rows == 0:
+            empty_batch = batch
+            continue
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        if pending_rows >= batch_rows:
+            combined = pa.Table.from_batches(pending).combine_chunks()
+            full_rows = pending_rows - pending_rows % batch_rows
+            yield from combined.slice(0, full_rows).to_batches(max_chunksize=batch_rows)
+            emitted = True
+            remainder = combined.slice(full_rows)
+            pending, pending_rows = remainder.to_batches(), remainder.num_rows
+    if pending_rows:
+        yield from pa.Table.from_batches(pending).combine_chunks().to_batches()
+    elif empty_batch is not None and not emitted:
+        # Only empty batches came through: keep one so consumers still get a schema
+        yield empty_batch
+
+
+def stream_bigquery_batches(
+    query: str,
+    table_name: str,
+    bigquery_client: bigquery.Client,
+    bqstorage_client: Optional[bigquery_storage.BigQueryReadClient] = None,
+    batch_rows: int = 100_000,
+    max_queue_size: int = 2,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Executes a BigQuery query and streams its result as PyArrow RecordBatches.
+
+    At most ``max_queue_size`` result pages are prefetched, so memory stays
+    bounded by the batch budget rather than the size of the table.
+
+    Args:
+        query (str): The BigQuery query to execute.
+        table_name (str): The table name, used for logging.
+        bigquery_client (bigquery.Client): The BigQuery client object used to execute the query.
+        bqstorage_client (bigquery_storage.BigQueryReadClient, optional): Storage Read API client used to download the result.
+        batch_rows (int, optional): Maximum number of rows per yielded batch. Defaults to 100_000.
+        max_queue_size (int, optional): Maximum number of result pages held in memory. Defaults to 2.
+
+    Yields:
+        pa.RecordBatch: The query result, batch by batch.
+    """
+    logger.info(f"Streaming query for table: {table_name}")
+    start_time = time.time()
+    num_rows, num_bytes, num_batches = 0, 0, 0
+    try:
+        row_iterator = bigquery_client.query(query).result()
+        batches = row_iterator.to_arrow_iterable(
+            bqstorage_client=bqstorage_client, max_queue_size=max_queue_size
+        )
+        for batch in _rebatch(batches, batch_rows):
+            num_rows += batch.num_rows
+            num_bytes += batch.nbytes
+            num_batches += 1
+            yield batch
+    except Exception as e:
+        logger.error(f"Error streaming query for {table_name}: {e}")
+        raise
+    elapsed_time = time.time() - start_time
+    record("extract", table_name, elapsed_time, num_rows, num_bytes, num_batches)
+    logger.info(
+        f"Streamed {num_rows} rows in {num_batches} batches for {table_name} in {elapsed_time:.2f} seconds"
+    )
@@ -0,0 +1,111 @@
+""" On-disk cache of BigQuery results, keyed by query fingerprint """
+import hashlib
+import os
+import time
+from typing import Optional
+
+import pyarrow as pa
+from loguru import logger
+
+
+class ResultCache:
+    """
+    Arrow IPC files of extracted tables, one per query.
+
+    Entries expire ``ttl_seconds`` after they were written. When the cache
+    grows above ``max_bytes`` the least recently read entries are evicted.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float = 86_400, max_bytes: int = 10 * 2**30):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, query: str) -> str:
+        """
+        Path of the entry of a query.
+
+        Args:
+            query (str): The query text.
+
+        Returns:
+            str: The path of the Arrow IPC file.
+        """
+        key = hashlib.sha256(query.encode()).hexdigest()
+        return os.path.join(self.directory, f"{key}.arrow")
+
+    def get(self, query: str, table_name: str) -> Optional[pa.Table]:
+        """
+        Read the cached result of a query.
+
+        Args:
+            query (str): The query text.
+            table_name (str): The table the query extracts, for logging.
+
+        Returns:
+            Optional[pa.Table]: The cached table, or None on a miss or an expired entry.
+        """
+        path = self.path(query)
+        try:
+            written_at = os.path.getmtime(path)
+        except FileNotFoundError:
+            logger.info(f"Cache miss for table: {table_name}")
+            return None
+        if time.time() - written_at > self.ttl_seconds:
+            logger.info(f"Cache entry for table: {table_name} expired")
+            self._remove(path)
+            return None
+
+        try:
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+            # Access time drives LRU eviction; the modification time keeps the write time
+            os.utime(path, (time.time(), written_at))
+        except FileNotFoundError:  # evicted by a concurrent writer
+            logger.info(f"Cache miss for table: {table_name}")
+            return None
+        logger.info(f"Cache hit for table: {table_name} ({table.num_rows} rows from {path})")
+        return table
+
+    def put(self, query: str, table: pa.Table):
+        """
+        Store the result of a query, then evict entries over the size bound.
+
+        Args:
+            query (str): The query text.
+            table (pa.Table): The query result.
+        """
+        path = self.path(query)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently read entries until the cache fits in ``max_bytes``."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".arrow"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:  # evicted by a concurrent writer
+                    continue
+                entries.append((stat.st_atime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            logger.info(f"Evicting cache entry {path}")
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,99 @@
+""" Shared Google Cloud clients, created once per process and reused across tables and runs """
+import os
+from functools import lru_cache
+
+from google.cloud import bigquery
+from google.cloud import bigquery_storage
+from google.cloud.bigquery_storage_v1.services.big_query_read.transports import (
+    BigQueryReadGrpcTransport,
+)
+from google.oauth2 import service_account
+from loguru import logger
+
+# Keep the idle channel alive between the tables of a run and between scheduled
+# runs. The transport already lifts gRPC's 4 MB message size limits.
+STORAGE_GRPC_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30_000),
+    ("grpc.keepalive_permit_without_calls", 1),
+]
+
+
+def _service_account_path() -> str:
+    service_account_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+    if not service_account_path:
+        raise EnvironmentError(
+            "No valid credentials found for BigQuery authentication."
+        )
+    return service_account_path
+
+
+@lru_cache(maxsize=None)
+def _load_credentials(path: str, modified_at: float) -> service_account.Credentials:
+    logger.info(f"Loading service account credentials from {path}")
+    return service_account.Credentials.from_service_account_file(path)
+
+
+def get_credentials() -> service_account.Credentials:
+    """
+    Get the service account credentials named by ``GOOGLE_APPLICATION_CREDENTIALS``.
+
+    The file is read once and the credentials (including their access token)
+    are reused until the file changes.
+
+    Returns:
+        service_account.Credentials: The credentials.
+
+    Raises:
+        EnvironmentError: If no valid credentials are found for BigQuery authentication.
+    """
+    path = _service_account_path()
+    return _load_credentials(path, os.path.getmtime(path))
+
+
+@lru_cache(maxsize=None)
+def _bigquery_client(project_name: str, credentials) -> bigquery.Client:
+    return bigquery.Client(project=project_name, credentials=credentials)
+
+
+def get_bigquery_client(project_name: str) -> bigquery.Client:
+    """
+    Get the shared BigQuery client of a project.
+
+    Args:
+        project_name (str): The name of the BigQuery project.
+
+    Returns:
+        bigquery.Client: The BigQuery client object.
+
+    Raises:
+        EnvironmentError: If no valid credentials are found for BigQuery authentication.
+    """
+    return _bigquery_client(project_name, get_credentials())
+
+
+@lru_cache(maxsize=None)
+def _bigquery_storage_client(credentials) -> bigquery_storage.BigQueryReadClient:
+    channel = BigQueryReadGrpcTransport.create_channel(
+        credentials=credentials, options=STORAGE_GRPC_OPTIONS
+    )
+    return bigquery_storage.BigQueryReadClient(
+        transport=BigQueryReadGrpcTransport(channel=channel)
+    )
+
+
+def get_bigquery_storage_client() -> bigquery_storage.BigQueryReadClient:
+    """
+    Get the shared BigQuery Storage Read API client, used to download query results.
+
+    It holds a single gRPC channel, kept alive between runs and shared by every
+    download of the process, which would otherwise open a new client per table.
+    Concurrent read streams, including those of parallel extract workers, are
+    multiplexed over that one connection; no channel pool is kept.
+
+    Returns:
+        bigquery_storage.BigQueryReadClient: The BigQuery Storage read client object.
+
+    Raises:
+        EnvironmentError: If no valid credentials are found for BigQuery authentication.
+    """
+    return _bigquery_storage_client(get_credentials())
@@ -1,14 +1,71 @@
-from typing import List
+import os
+import re
+from typing import Dict, List, Optional
 from loguru import logger
+import pyarrow as pa
+import pyarrow.fs as pafs
 
+from metrics import track
+from models import duckdb_ddl, enum_type_name, table_enum_columns, table_model_mapping
 
-def create_table_from_pyarrow_tables(duckdb_con, pyarrow_tables: dict):
+
+def create_typed_table(
+    duckdb_con,
+    table_name: str,
+    source: str,
+    column_names: List[str],
+    column_types: str = "model",
+    enums: bool = True,
+) -> List[str]:
+    """
+    Create a DuckDB table with the DDL generated from its Pydantic model.
+
+    With ``column_types="narrow"`` integers are 32-bit and, when ``enums`` is
+    set, the low-cardinality columns of ``table_enum_columns`` become ENUMs
+    whose values are read from ``source``.
+
+    Parameters:
+    - duckdb_con: The DuckDB connection object.
+    - table_name: The name of the table to create.
+    - source: A relation (e.g. a registered Arrow table) holding the rows to load.
+    - column_names: The columns of ``source``.
+    - column_types: "model" or "narrow".
+    - enums: Whether ENUM types may be created from ``source``.
+
+    Returns:
+    The columns of the created table, in ``source`` order.
+    """
+    model_columns = table_model_mapping[table_name].model_fields
+    columns = [column for column in column_names if column in model_columns]
+    dropped = [column for column in column_names if column not in model_columns]
+    if dropped:
+        logger.warning(f"Columns {dropped} of {table_name} are not in its model and are not loaded")
+
+    narrow = column_types == "narrow"
+    enum_columns = []
+    if narrow and enums:
+        for column in table_enum_columns.get(table_name, []):
+            if column in columns:
+                type_name = enum_type_name(table_name, column)
+                duckdb_con.execute(f"DROP TYPE IF EXISTS {type_name}")
+                duckdb_con.execute(
+                    f"CREATE TYPE {type_name} AS ENUM "
+                    f"(SELECT DISTINCT {column} FROM {source} WHERE {column} IS NOT NULL ORDER BY 1)"
+                )
+                enum_columns.append(column)
+    duckdb_con.execute(duckdb_ddl(table_name, columns, narrow, enum_columns))
+    return columns
+
+
+def create_table_from_pyarrow_tables(duckdb_con, pyarrow_tables: dict, column_types: str = "inferred"):
     """
     Create tables from a dictionary of PyArrow Table objects in DuckDB.
 
     Parameters:
     - duckdb_con: The DuckDB connection object.
     - pyarrow_tables: A dictionary containing table names as keys and PyArrow Table objects as values.
+    - column_types: "inferred" to keep the Arrow types, "model" or "narrow" to use the
+      DDL generated from the table models (see ``create_typed_table``).
 
     Returns:
     None
@@ -18,18 +75,95 @@ def create_table_from_pyarrow_tables(duckdb_con, pyarrow_tables: dict):
     """
     for table_name, arrow_table in pyarrow_tables.items():
         try:
-            # Temporarily register the PyArrow table to make it available for SQL operations
-            duckdb_con.register('temp_arrow_table', arrow_table)
-            # Create table in DuckDB from the registered PyArrow table
-            duckdb_con.execute(f"CREATE TABLE {table_name} AS SELECT * FROM temp_arrow_table")
-            # Unregister the temporary table to clean up
-            duckdb_con.unregister('temp_arrow_table')
+            with track("load", table_name) as metrics:
+                # Temporarily register the PyArrow table to make it available for SQL operations
+                duckdb_con.register('temp_arrow_table', arrow_table)
+                # Create table in DuckDB from the registered PyArrow table
+                if column_types == "inferred":
+                    duckdb_con.execute(f"CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM temp_arrow_table")
+                else:
+                    duckdb_con.execute(f"DROP TABLE IF EXISTS {table_name}")
+                    columns = create_typed_table(
+                        duckdb_con, table_name, "temp_arrow_table", arrow_table.column_names, column_types
+                    )
+                    duckdb_con.execute(
+                        f"INSERT INTO {table_name} BY NAME SELECT {', '.join(columns)} FROM temp_arrow_table"
+                    )
+                # Unregister the temporary table to clean up
+                duckdb_con.unregister('temp_arrow_table')
+                metrics.rows, metrics.bytes = arrow_table.num_rows, arrow_table.nbytes
             logger.info(f"Table {table_name} created successfully in DuckDB from PyArrow Table")
         except Exception as e:
             logger.error(f"Error while creating table {table_name} in DuckDB from PyArrow Table: {e}")
             raise
 
 
+def register_pyarrow_tables(duckdb_con, pyarrow_tables: dict):
+    """
+    Register PyArrow Tables as DuckDB views without copying them into DuckDB storage.
+
+    Registered views are only visible to the connection (or cursor) they are
+    registered on, and are scanned directly from Arrow memory by queries such
+    as ``COPY``.
+
+    Parameters:
+    - duckdb_con: The DuckDB connection (or cursor) object.
+    - pyarrow_tables: A dictionary containing table names as keys and PyArrow Table objects as values.
+
+    Returns:
+    None
+    """
+    for table_name, arrow_table in pyarrow_tables.items():
+        duckdb_con.register(table_name, arrow_table)
+        logger.info(f"Table {table_name} registered in DuckDB as a zero-copy Arrow view")
+
+
+def append_batches_to_duckdb(
+    duckdb_con, table_name: str, reader: pa.RecordBatchReader, column_types: str = "inferred"
+):
+    """
+    Append a stream of record batches to a DuckDB table, creating it if needed.
+
+    DuckDB consumes the reader batch by batch, so the stream is never
+    materialized as a single PyArrow Table.
+
+    Parameters:
+    - duckdb_con: The DuckDB connection object.
+    - table_name: The name of the table to append to.
+    - reader: A PyArrow RecordBatchReader producing the rows to append.
+    - column_types: "inferred", "model" or "narrow". Streamed rows are not known up
+      front, so "narrow" keeps low-cardinality columns as VARCHAR.
+
+    Returns:
+    None
+
+    Raises:
+    - Exception: If there is an error while appending to the table in DuckDB.
+    """
+    try:
+        # Create the table from the schema alone so no batch is consumed early
+        duckdb_con.register('temp_arrow_table', reader.schema.empty_table())
+        if column_types == "inferred":
+            duckdb_con.execute(f"CREATE TABLE IF NOT EXISTS {table_name} AS SELECT * FROM temp_arrow_table")
+            select = "*"
+        else:
+            columns = create_typed_table(
+                duckdb_con, table_name, "temp_arrow_table", reader.schema.names, column_types, enums=False
+            )
+            select = ", ".join(columns)
+        duckdb_con.unregister('temp_arrow_table')
+        with track("load", table_name) as metrics:
+            duckdb_con.register('temp_arrow_reader', reader)
+            metrics.rows = duckdb_con.execute(
+                f"INSERT INTO {table_name} BY NAME SELECT {select} FROM temp_arrow_reader"
+            ).fetchone()[0]
+            duckdb_con.unregister('temp_arrow_reader')
+        logger.info(f"Record batches appended successfully to {table_name} in DuckDB")
+    except Exception as e:
+        logger.error(f"Error while appending record batches to {table_name} in DuckDB: {e}")
+        raise
+
+
 def connect_to_md(duckdb_con, motherduck_token: str):
     """
     Connects to the Mother Duck database using the provided DuckDB connection and Mother Duck token.
@@ -61,8 +195,243 @@ def load_aws_credentials(duckdb_con, profile: str):
     duckdb_con.sql(f"CALL load_aws_credentials('{profile}');")
 
 
+# Extension and COPY options of each supported file format
+FILE_FORMATS = {
+    "parquet": (".parquet", "FORMAT PARQUET"),
+    "csv": (".csv", "FORMAT CSV, HEADER"),
+    "csv.gz": (".csv.gz", "FORMAT CSV, HEADER, COMPRESSION 'gzip'"),
+    "csv.zst": (".csv.zst", "FORMAT CSV, HEADER, COMPRESSION 'zstd'"),
+}
+
+
+def _file_system(duckdb_con, path: str):
+    """The PyArrow file system of a local or S3 path, using the S3 credentials loaded into DuckDB."""
+    if not path.startswith("s3://"):
+        return pafs.LocalFileSystem(), os.path.abspath(path)
+    settings = dict(
+        duckdb_con.execute(
+            """
+            SELECT name, value FROM duckdb_settings()
+            WHERE name IN ('s3_access_key_id', 's3_secret_access_key', 's3_session_token', 's3_region')
+            """
+        ).fetchall()
+    )
+    if not settings.get("s3_access_key_id"):
+        return pafs.FileSystem.from_uri(path)
+    file_system = pafs.S3FileSystem(
+        access_key=settings["s3_access_key_id"],
+        secret_key=settings["s3_secret_access_key"],
+        session_token=settings.get("s3_session_token") or None,
+        region=settings.get("s3_region") or None,
+    )
+    return file_system, path[len("s3://"):]
+
+
+def remove_partition_files(
+    duckdb_con, table: str, target: str, partition_column: str, file_suffix: str, extension: str
+):
+    """
+    Remove the files a partitioned ``copy_table_to_files`` wrote to the partitions of a table.
+
+    Only the ``year=/month=`` folders present in the table are cleared, and only of the
+    ``data{file_suffix}_{i}`` files, so other partitions and delta files of other runs are kept.
+
+    Args:
+        duckdb_con: The DuckDB connection object, with S3 credentials loaded for S3 targets.
+        table (str): The name of the table about to be written.
+        target (str): The local or S3 folder of the table.
+        partition_column (str): Timestamp column of the year/month partitions.
+        file_suffix (str): The file suffix of the files to remove.
+        extension (str): The file extension of the files to remove.
+    """
+    file_system, root = _file_system(duckdb_con, target)
+    pattern = re.compile(rf"data{re.escape(file_suffix)}_\d+{re.escape(extension)}")
+    partitions = duckdb_con.execute(
+        f"SELECT DISTINCT YEAR({partition_column}), MONTH({partition_column}) FROM {table}"
+    ).fetchall()
+    for year, month in partitions:
+        folder = f"{root}/year={'NULL' if year is None else year}/month={'NULL' if month is None else month}"
+        files = file_system.get_file_info(pafs.FileSelector(folder, allow_not_found=True))
+        for info in files:
+            if info.type == pafs.FileType.File and pattern.fullmatch(info.base_name):
+                file_system.delete_file(info.path)
+
+
+def copy_table_to_files(
+    duckdb_con,
+    table: str,
+    base_path: str,
+    file_format: str = "parquet",
+    file_suffix: str = "",
+    partitioned: bool = False,
+    partition_column: Optional[str] = None,
+    compression: str = "zstd",
+    row_group_size: int = 1_000_000,
+    per_thread_output: bool = False,
+) -> str:
+    """
+    Copies a DuckDB table to files, either as a single file or as a hive-partitioned dataset.
+
+    In the partitioned layout every table gets its own ``{base_path}/{table}/`` folder. Tables with
+    a ``partition_column`` are split into ``year=/month=`` folders derived from it. Rewriting a table
+    first clears the files of the partitions present in the new data (see ``remove_partition_files``),
+    so a smaller rewrite leaves no stale ``data_{i}`` files behind; other partitions are kept.
+
+    Args:
+        duckdb_con: The DuckDB connection object.
+        table (str): The name of the table to write.
+        base_path (str): The folder (local or S3) to write to.
+        file_format (str, optional): One of ``FILE_FORMATS``. Defaults to "parquet".
+        file_suffix (str, optional): Appended to the file name, e.g. for incremental deltas. Defaults to "".
+        partitioned (bool, optional): Whether to use the hive-partitioned layout. Defaults to False.
+        partition_column (str, optional): Timestamp column used to derive year/month partitions. Defaults to None.
+        compression (str, optional): Parquet compression codec. Defaults to "zstd".
+        row_group_size (int, optional): Parquet row group size. Defaults to 1_000_000.
+        per_thread_output (bool, optional): Write one file per DuckDB thread into a
+            ``{base_path}/{table}{file_suffix}/`` folder instead of a single file. Only applies
+            to the non-partitioned layout. Defaults to False.
+
+    Raises:
+        ValueError: If the file format is unknown.
+
+    Returns:
+        str: The path written to.
+    """
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Unknown file format: {file_format}")
+    extension, options = FILE_FORMATS[file_format]
+    if file_format == "parquet":
+        options += f", COMPRESSION '{compression}', ROW_GROUP_SIZE {row_group_size}"
+
+    select = f"SELECT * FROM {table}"
+    if not partitioned:
+        target = f"{base_path}/{table}{file_suffix}{extension}"
+        if per_thread_output:
+            target = f"{base_path}/{table}{file_suffix}"
+            options += (
+                ", PER_THREAD_OUTPUT 1, OVERWRITE_OR_IGNORE 1, FILENAME_PATTERN 'data_{i}',"
+                f" FILE_EXTENSION '{extension[1:]}'"
+            )
+            if os.path.isdir(target):
+                # OVERWRITE_OR_IGNORE would keep the extra files of a previous run with more threads
+                for name in os.listdir(target):
+                    if name.startswith("data_") and name.endswith(extension):
+                        os.remove(os.path.join(target, name))
+    elif partition_column:
+        select = f"""
+            SELECT *,
+                YEAR({partition_column}) AS year,
+                MONTH({partition_column}) AS month
+            FROM {table}"""
+        target = f"{base_path}/{table}"
+        remove_partition_files(duckdb_con, table, target, partition_column, file_suffix, extension)
+        options += (
+            f", PARTITION_BY (year, month), OVERWRITE_OR_IGNORE 1,"
+            f" FILENAME_PATTERN 'data{file_suffix}_{{i}}', FILE_EXTENSION '{extension[1:]}'"
+        )
+    else:
+        target = f"{base_path}/{table}/data{file_suffix}{extension}"
+
+    duckdb_con.execute(
+        f"""
+        COPY (
+            {select}
+        ) 
+        TO '{target}' 
+        ({options});
+        """
+    )
+    return target
+
+
+def copy_table_to_parquet(
+    duckdb_con,
+    table: str,
+    base_path: str,
+    file_suffix: str = "",
+    partitioned: bool = False,
+    partition_column: Optional[str] = None,
+    compression: str = "zstd",
+    row_group_size: int = 1_000_000,
+) -> str:
+    """
+    Copies a DuckDB table to Parquet, see ``copy_table_to_files``.
+
+    Returns:
+        str: The path written to.
+    """
+    return copy_table_to_files(
+        duckdb_con,
+        table,
+        base_path,
+        "parquet",
+        file_suffix=file_suffix,
+        partitioned=partitioned,
+        partition_column=partition_column,
+        compression=compression,
+        row_group_size=row_group_size,
+    )
+
+
+def write_to_local_from_duckdb(
+    duckdb_con,
+    table: str,
+    local_path: str,
+    file_format: str = "csv",
+    file_suffix: str = "",
+    partition_column: Optional[str] = None,
+    partitioned: bool = False,
+    compression: str = "zstd",
+    row_group_size: int = 1_000_000,
+    per_thread_output: bool = False,
+):
+    """
+    Writes a DuckDB table to a local directory, using the same layout as the S3 sink.
+
+    Args:
+        duckdb_con: The DuckDB connection object.
+        table (str): The name of the table to write.
+        local_path (str): The directory to write to, created if needed.
+        file_format (str, optional): One of ``FILE_FORMATS``. Defaults to "csv".
+        file_suffix (str, optional): Appended to the file name. Defaults to "".
+        partition_column (str, optional): Timestamp column of the year/month partitions. Defaults to None.
+        partitioned (bool, optional): Whether to use the hive-partitioned layout. Defaults to False.
+        compression (str, optional): Parquet compression codec. Defaults to "zstd".
+        row_group_size (int, optional): Parquet row group size. Defaults to 1_000_000.
+        per_thread_output (bool, optional): Write one file per DuckDB thread. Defaults to False.
+
+    Returns:
+        None
+    """
+    os.makedirs(local_path, exist_ok=True)
+    logger.info(f"Writing data to {local_path}/{table}{file_suffix}")
+    try:
+        target = copy_table_to_files(
+            duckdb_con,
+            table,
+            local_path,
+            file_format,
+            file_suffix=file_suffix,
+            partitioned=partitioned,
+            partition_column=partition_column,
+            compression=compression,
+            row_group_size=row_group_size,
+            per_thread_output=per_thread_output,
+        )
+        logger.info(f"Successfully wrote {table} locally at {target}")
+    except Exception as e:
+        logger.error(f"Error writing {table} locally: {e}")
+        raise
+
+
 def write_to_s3_from_duckdb(
-    duckdb_con, tables: List[str], s3_path: str
+    duckdb_con,
+    tables: List[str],
+    s3_path: str,
+    file_suffix: str = "",
+    partition_columns: Optional[Dict[str, Optional[str]]] = None,
+    compression: str = "zstd",
+    row_group_size: int = 1_000_000,
 ):
     """
     Writes specified tables from DuckDB to S3.
@@ -71,24 +440,31 @@ def write_to_s3_from_duckdb(
         duckdb_con: The DuckDB connection object.
         tables (List[str]): The names of the tables to write.
         s3_path (str): The S3 path to write the data to.
+        file_suffix (str, optional): Appended to the file name, e.g. to write an incremental
+            delta next to the full snapshot instead of overwriting it. Defaults to "".
+        partition_columns (Dict[str, Optional[str]], optional): When given, tables are written in the
+            hive-partitioned layout, partitioned by year/month of their mapped timestamp column
+            (unmapped tables get a single file in their folder). Defaults to None.
+        compression (str, optional): Parquet compression codec. Defaults to "zstd".
+        row_group_size (int, optional): Parquet row group size. Defaults to 1_000_000.
 
     Returns:
         None
     """
     for table in tables:
-        logger.info(f"Writing data to S3 {s3_path}/{table}")
+        logger.info(f"Writing data to S3 {s3_path}/{table}{file_suffix}")
         try:
-            duckdb_con.execute(
-                f"""
-                COPY (
-                    SELECT *
-                    FROM {table}
-                ) 
-                TO '{s3_path}/{table}.parquet' 
-                (FORMAT PARQUET);
-                """
+            target = copy_table_to_parquet(
+                duckdb_con,
+                table,
+                s3_path,
+                file_suffix=file_suffix,
+                partitioned=partition_columns is not None,
+                partition_column=(partition_columns or {}).get(table),
+                compression=compression,
+                row_group_size=row_group_size,
             )
-            logger.info(f"Successfully wrote {table} to S3 at {s3_path}/{table}.parquet")
+            logger.info(f"Successfully wrote {table} to S3 at {target}")
         except Exception as e:
             logger.error(f"Error writing {table} to S3: {e}")
             raise
@@ -98,7 +474,8 @@ def write_to_md_from_duckdb(
     duckdb_con,
     table: str,
     local_database: str,
-    remote_database: str
+    remote_database: str,
+    merge_key: Optional[str] = None,
 ):
     """
     Writes data from a DuckDB table to Motherduck.
@@ -108,6 +485,8 @@ def write_to_md_from_duckdb(
         table (str): The name of the table to write data from.
         local_database (str): The name of the local database.
         remote_database (str): The name of the remote database.
+        merge_key (str, optional): When set, remote rows whose key is present locally are
+            deleted before inserting, so incremental deltas are merged instead of duplicated.
 
     Returns:
         None
@@ -118,6 +497,13 @@ def write_to_md_from_duckdb(
         duckdb_con.execute(
             f"CREATE TABLE IF NOT EXISTS {remote_database}.{table} AS SELECT * FROM {local_database}.{table} LIMIT 0"
         )
+        if merge_key:
+            duckdb_con.execute(
+                f"""
+                DELETE FROM {remote_database}.main.{table}
+                WHERE {merge_key} IN (SELECT {merge_key} FROM {local_database}.{table})
+                """
+            )
         # Insert new data
         duckdb_con.execute(
             f"""
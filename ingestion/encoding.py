@@ -0,0 +1,122 @@
+""" Helper functions for dictionary-encoding low-cardinality string columns """
+from typing import Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from metrics import ColumnCardinality, record_cardinality
+from models import table_enum_columns
+
+
+def _is_plain_string(data_type: pa.DataType) -> bool:
+    return pa.types.is_string(data_type) or pa.types.is_large_string(data_type)
+
+
+def dictionary_encode_table(
+    table: pa.Table,
+    table_name: str,
+    mode: str = "configured",
+    max_ratio: float = 0.01,
+    columns: Optional[List[str]] = None,
+    max_value_bytes: int = 32,
+) -> Tuple[pa.Table, List[ColumnCardinality]]:
+    """
+    Dictionary-encode the low-cardinality string columns of a table.
+
+    Unconfigured columns averaging more than ``max_value_bytes`` Arrow bytes per
+    value (URIs, emails, names, ...) are rarely low-cardinality; their distinct
+    values are not counted.
+
+    Args:
+        table (pa.Table): The table to encode.
+        table_name (str): The name of the table.
+        mode (str, optional): "configured" encodes the columns of ``table_enum_columns``,
+            "auto" also any string column with at most ``max_ratio`` distinct values per row,
+            "off" only reports cardinalities. Defaults to "configured".
+        max_ratio (float, optional): Distinct/rows ratio below which "auto" encodes a column. Defaults to 0.01.
+        columns (List[str], optional): Encode exactly these columns instead, skipping detection. Defaults to None.
+        max_value_bytes (int, optional): Average bytes per value above which an unconfigured
+            column is not counted or encoded. Defaults to 32.
+
+    Returns:
+        Tuple[pa.Table, List[ColumnCardinality]]: The encoded table and the cardinality of
+        each plain string column, without a distinct count for the wide ones.
+    """
+    configured = table_enum_columns.get(table_name, []) if mode != "off" else []
+    stats = []
+    for i, field in enumerate(table.schema):
+        if not _is_plain_string(field.type):
+            continue
+        column = table.column(i)
+        if columns is not None:
+            if field.name in columns:
+                table = table.set_column(i, field.name, pc.dictionary_encode(column))
+            continue
+
+        distinct, encode = None, field.name in configured
+        if encode or column.nbytes <= max_value_bytes * table.num_rows:
+            distinct = pc.count_distinct(column, mode="all").as_py()
+            encode = encode or (
+                mode == "auto" and table.num_rows > 0 and distinct <= max_ratio * table.num_rows
+            )
+        encoded_bytes = None
+        if encode:
+            encoded = pc.dictionary_encode(column)
+            encoded_bytes = encoded.nbytes
+            table = table.set_column(i, field.name, encoded)
+        stats.append(
+            ColumnCardinality(
+                table=table_name,
+                column=field.name,
+                rows=table.num_rows,
+                distinct=distinct,
+                plain_bytes=column.nbytes,
+                encoded_bytes=encoded_bytes,
+            )
+        )
+    return table, stats
+
+
+def dictionary_encode_batches(
+    batches: Iterator[pa.RecordBatch],
+    table_name: str,
+    mode: str = "configured",
+    max_ratio: float = 0.01,
+    max_value_bytes: int = 32,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Dictionary-encode a stream of record batches.
+
+    Columns are chosen on the first batch, whose cardinalities are recorded in
+    the run report, and the same columns are encoded in every later batch so
+    the stream keeps a single schema.
+
+    Args:
+        batches (Iterator[pa.RecordBatch]): The record batches to encode.
+        table_name (str): The name of the table the batches belong to.
+        mode (str, optional): See ``dictionary_encode_table``. Defaults to "configured".
+        max_ratio (float, optional): See ``dictionary_encode_table``. Defaults to 0.01.
+        max_value_bytes (int, optional): See ``dictionary_encode_table``. Defaults to 32.
+
+    Yields:
+        pa.RecordBatch: The encoded batches.
+    """
+    columns = None
+    for batch in batches:
+        if columns is None:
+            table, stats = dictionary_encode_table(
+                pa.Table.from_batches([batch]),
+                table_name,
+                mode,
+                max_ratio,
+                max_value_bytes=max_value_bytes,
+            )
+            columns = [column.column for column in stats if column.encoded_bytes is not None]
+            record_cardinality(stats)
+        else:
+            table, _ = dictionary_encode_table(
+                pa.Table.from_batches([batch]), table_name, columns=columns
+            )
+        # The table holds a single chunk; an empty one has no batches left to yield
+        encoded = table.to_batches()
+        yield encoded[0] if encoded else pa.RecordBatch.from_pylist([], schema=table.schema)
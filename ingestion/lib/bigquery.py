@@ -1,9 +1,7 @@
-import os
 from google.cloud import bigquery
-from google.oauth2 import service_account
-from google.auth.exceptions import DefaultCredentialsError
 from loguru import logger
 import time
+from ingestion.clients import get_bigquery_client  # shared, cached client factory
 from ingestion.models import PypiJobParameters, FileDownloads
 import pyarrow as pa
 
@@ -26,31 +24,6 @@ def build_pypi_query(
     """
 
 
-def get_bigquery_client(project_name: str) -> bigquery.Client:
-    """Get Big Query client"""
-    try:
-        service_account_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
-
-        if service_account_path:
-            credentials = service_account.Credentials.from_service_account_file(
-                service_account_path
-            )
-            bigquery_client = bigquery.Client(
-                project=project_name, credentials=credentials
-            )
-            return bigquery_client
-
-        raise EnvironmentError(
-            "No valid credentials found for BigQuery authentication."
-        )
-
-    except DefaultCredentialsError as creds_error:
-        raise creds_error
-
-
-2
-
-
 def get_bigquery_result(
     query_str: str, bigquery_client: bigquery.Client, model: FileDownloads
 ) -> pa.Table:
@@ -4,6 +4,7 @@ from pydantic import BaseModel, ValidationError
 from datetime import datetime
 from typing import Optional, Dict
 import pyarrow as pa
+from ingestion.models import collect_validation_errors
 
 DUCKDB_EXTENSION = ["aws", "httpfs"]
 
@@ -86,23 +87,19 @@ class TableValidationError(Exception):
     pass
 
 
-def validate_table(table: pa.Table, model: Type[BaseModel]):
+def validate_table(table: pa.Table, model: Type[BaseModel], workers: int = 1):
     """
-    Validates each row of a PyArrow Table against a Pydantic model.
+    Validates a PyArrow Table against a Pydantic model, checking whole columns
+    (including nested structs) with Arrow kernels and only instantiating the
+    model for flagged rows.
     Raises TableValidationError if any row fails validation.
 
     :param table: PyArrow Table to validate.
     :param model: Pydantic model to validate against.
+    :param workers: Processes used to validate flagged rows of large tables.
     :raises: TableValidationError
     """
-    errors = []
-
-    for i in range(table.num_rows):
-        row = {column: table[column][i].as_py() for column in table.column_names}
-        try:
-            model(**row)
-        except ValidationError as e:
-            errors.append(f"Row {i} failed validation: {e}")
+    errors = collect_validation_errors(table, model, workers=workers)
 
     if errors:
         error_message = "\n".join(errors)
@@ -0,0 +1,206 @@
+""" Helper functions for recording per-table, per-stage pipeline metrics """
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+
+class StageMetrics(BaseModel):
+    """Metrics for one stage (extract, validate, load, sink:<destination>) of one table."""
+
+    table: str
+    stage: str
+    started_at: datetime
+    wall_seconds: float = 0.0
+    rows: Optional[int] = None
+    bytes: Optional[int] = None
+    batches: Optional[int] = None
+    rss_delta_bytes: Optional[int] = None  # resident memory at the end minus at the start of the stage
+    process_peak_rss_bytes: Optional[int] = None  # peak RSS of the whole process so far, not of this stage
+
+
+class ColumnCardinality(BaseModel):
+    """Cardinality of one string column and the savings of dictionary-encoding it."""
+
+    table: str
+    column: str
+    rows: int
+    distinct: Optional[int] = None  # None for columns too wide to be counted
+    plain_bytes: int
+    encoded_bytes: Optional[int] = None  # None when the column was left as plain strings
+
+
+class RunReport(BaseModel):
+    """Machine-readable report of a pipeline run."""
+
+    run_id: str
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    wall_seconds: Optional[float] = None
+    peak_rss_bytes: Optional[int] = None
+    stages: List[StageMetrics] = Field(default_factory=list)
+    columns: List[ColumnCardinality] = Field(default_factory=list)
+
+
+_report: Optional[RunReport] = None
+_lock = threading.Lock()
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of the current process, in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Current resident set size of the process in bytes, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def start_run(run_id: str) -> RunReport:
+    """
+    Start collecting metrics for a new run.
+
+    Args:
+        run_id (str): Identifier of the run.
+
+    Returns:
+        RunReport: The report stages will be recorded into.
+    """
+    global _report
+    with _lock:
+        _report = RunReport(run_id=run_id, started_at=datetime.now(timezone.utc))
+    return _report
+
+
+def record(
+    stage: str,
+    table: str,
+    wall_seconds: float,
+    rows: Optional[int] = None,
+    bytes: Optional[int] = None,
+    batches: Optional[int] = None,
+) -> StageMetrics:
+    """
+    Record the metrics of a finished stage into the current run report, if any.
+
+    Args:
+        stage (str): The stage name, e.g. "extract" or "sink:s3".
+        table (str): The table the stage processed.
+        wall_seconds (float): Wall time spent in the stage.
+        rows (int, optional): Rows processed.
+        bytes (int, optional): Bytes processed (Arrow buffer size).
+        batches (int, optional): Record batches processed.
+
+    Returns:
+        StageMetrics: The recorded metrics.
+    """
+    metrics = StageMetrics(
+        table=table,
+        stage=stage,
+        started_at=datetime.now(timezone.utc),
+        wall_seconds=wall_seconds,
+        rows=rows,
+        bytes=bytes,
+        batches=batches,
+        process_peak_rss_bytes=peak_rss_bytes(),
+    )
+    _append(metrics)
+    return metrics
+
+
+@contextmanager
+def track(stage: str, table: str) -> Iterator[StageMetrics]:
+    """
+    Time a stage of a table and record it into the current run report, if any.
+
+    The yielded metrics can be filled in with rows, bytes and batches. Stages of
+    other tables running concurrently also count towards ``rss_delta_bytes``.
+
+    Args:
+        stage (str): The stage name, e.g. "extract" or "sink:s3".
+        table (str): The table the stage processes.
+
+    Yields:
+        StageMetrics: The metrics of the stage.
+    """
+    metrics = StageMetrics(table=table, stage=stage, started_at=datetime.now(timezone.utc))
+    start_rss = current_rss_bytes()
+    start_time = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.wall_seconds = time.perf_counter() - start_time
+        end_rss = current_rss_bytes()
+        if start_rss is not None and end_rss is not None:
+            metrics.rss_delta_bytes = end_rss - start_rss
+        metrics.process_peak_rss_bytes = peak_rss_bytes()
+        _append(metrics)
+
+
+def _append(metrics: StageMetrics):
+    with _lock:
+        if _report is not None:
+            _report.stages.append(metrics)
+
+
+def record_cardinality(columns: List[ColumnCardinality]):
+    """
+    Add per-column cardinality statistics to the current run report, if any.
+
+    Args:
+        columns (List[ColumnCardinality]): The statistics of one table's string columns.
+    """
+    with _lock:
+        if _report is not None:
+            _report.columns.extend(columns)
+
+
+def finish_run(report_path: Optional[str] = None) -> Optional[RunReport]:
+    """
+    Finish the current run, log a per-stage summary and optionally write the report as JSON.
+
+    Args:
+        report_path (str, optional): Where to write the JSON report. Defaults to None.
+
+    Returns:
+        Optional[RunReport]: The finished report, or None if no run was started.
+    """
+    global _report
+    with _lock:
+        report, _report = _report, None
+    if report is None:
+        return None
+
+    report.finished_at = datetime.now(timezone.utc)
+    report.wall_seconds = (report.finished_at - report.started_at).total_seconds()
+    report.peak_rss_bytes = peak_rss_bytes()
+    for metrics in report.stages:
+        logger.info(
+            f"{metrics.table} {metrics.stage}: {metrics.wall_seconds:.2f}s, rows={metrics.rows}, "
+            f"bytes={metrics.bytes}, batches={metrics.batches}, rss_delta={metrics.rss_delta_bytes}, "
+            f"process_peak_rss={metrics.process_peak_rss_bytes}"
+        )
+    for column in report.columns:
+        if column.encoded_bytes is not None:
+            logger.info(
+                f"{column.table}.{column.column}: {column.distinct} distinct values in {column.rows} rows, "
+                f"dictionary-encoded {column.plain_bytes} -> {column.encoded_bytes} bytes"
+            )
+    if report_path:
+        with open(report_path, "w") as f:
+            f.write(report.model_dump_json(indent=2))
+        logger.info(f"Run report written to {report_path}")
+    return report
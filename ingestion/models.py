@@ -1,10 +1,17 @@
 from pydantic import BaseModel, Field
-from typing import List, Union, Annotated, Type, Dict
-from pydantic import BaseModel, ValidationError
+from typing import List, Union, Annotated, Type, Dict, Any, Literal, Tuple, get_args, get_origin
+from pydantic import BaseModel, ValidationError, create_model
 from datetime import datetime
+from enum import Enum
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import multiprocessing
 from typing import Optional
+import annotated_types
+import numpy as np
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
 
 DUCKDB_EXTENSION = ["aws", "httpfs"]
 
@@ -110,6 +117,49 @@ class EcommerceJobParameters(BaseModel):
     destination: Annotated[Union[List[str], str], Field(default_factory=lambda: ["local"])]
     s3_path: Optional[str]
     aws_profile: Optional[str]
+    extract_workers: int = 4  # concurrent BigQuery result downloads
+    streaming: bool = False  # stream record batches instead of materializing tables
+    stream_batch_rows: int = 100_000  # rows per streamed record batch
+    stream_queue_size: int = 2  # result pages prefetched while streaming
+    incremental: bool = False  # only extract rows above each table's watermark
+    state_path: str = "ingestion_state.json"  # where watermarks are persisted
+    partitioned: bool = False  # hive-partitioned Parquet layout ({table}/year=/month=)
+    parquet_compression: str = "zstd"
+    parquet_row_group_size: int = 1_000_000
+    sink_workers: int = 3  # destinations written concurrently
+    zero_copy: bool = False  # sink from registered Arrow views instead of DuckDB tables
+    report_path: Optional[str] = "run_report.json"  # JSON run report with per-stage metrics
+    staging_database: Optional[str] = None  # DuckDB file used for staging; enables resumable runs
+    manifest_path: Optional[str] = None  # defaults to {staging_database}.manifest.json
+    columns: Optional[Dict[str, List[str]]] = None  # per-table columns selected in BigQuery
+    filters: Optional[Dict[str, str]] = None  # per-table predicates pushed down to BigQuery
+    model_columns: bool = False  # select only the fields of each table's Pydantic model
+    query_config: Optional[str] = None  # JSON file with "columns" and "filters" mappings
+    shards: Optional[Dict[str, int]] = None  # per-table number of key shards extracted in parallel
+    validation_workers: int = 1  # processes for the Pydantic fallback of large failing tables
+    validation_fail_fast: bool = False  # drop a table at its first failing row instead of quarantining rows
+    max_validation_errors: Optional[int] = 100  # error messages kept per table
+    validation_sample_rate: float = 1.0  # fraction of failing rows whose error message is kept
+    quarantine_path: Optional[str] = "quarantine"  # directory for rejected rows as Parquet; None drops them
+    duckdb_types: Literal["inferred", "model", "narrow"] = "inferred"  # how DuckDB column types are chosen
+    dictionary_encode: Literal["off", "configured", "auto"] = "off"  # low-cardinality strings as Arrow dictionaries
+    dictionary_max_ratio: float = 0.01  # with "auto", encode string columns with at most this distinct/rows ratio
+    dictionary_max_value_bytes: int = 32  # skip unconfigured string columns averaging more bytes per value
+    pipelined: bool = False  # each table flows through extract, validate, load and sink on its own
+    max_in_flight: int = 2  # tables processed at once when pipelined
+    cache_dir: Optional[str] = None  # cache extracted tables here as Arrow IPC files
+    cache_ttl_seconds: float = 86_400  # cached results older than this are downloaded again
+    cache_max_bytes: int = 10 * 2**30  # least recently used results are evicted above this size
+    local_path: str = "."  # directory the local destination writes to
+    local_format: Literal["csv", "csv.gz", "csv.zst", "parquet"] = "csv"
+    per_thread_output: bool = False  # local destination: one file per DuckDB thread (non-partitioned)
+
+
+class QueryConfig(BaseModel):
+    """Per-table column projections and row filters applied when querying BigQuery."""
+
+    columns: Dict[str, List[str]] = Field(default_factory=dict)
+    filters: Dict[str, str] = Field(default_factory=dict)
 
 # Mapping of table names to Pydantic models
 table_model_mapping: Dict[str, Type[BaseModel]] = {
@@ -122,17 +172,482 @@ table_model_mapping: Dict[str, Type[BaseModel]] = {
     "users": Users,
 }
 
+# Column used as high-water mark when extracting incrementally
+table_watermark_columns: Dict[str, str] = {
+    "distribution_centers": "id",
+    "events": "created_at",
+    "inventory_items": "created_at",
+    "order_items": "created_at",
+    "orders": "created_at",
+    "products": "id",
+    "users": "created_at",
+}
+
+# Timestamp column used to derive year/month partitions (None: single file)
+table_partition_columns: Dict[str, Optional[str]] = {
+    "distribution_centers": None,
+    "events": "created_at",
+    "inventory_items": "created_at",
+    "order_items": "created_at",
+    "orders": "created_at",
+    "products": None,
+    "users": "created_at",
+}
+
+# Key used to merge incremental rows into existing tables
+table_primary_keys: Dict[str, str] = {
+    "distribution_centers": "id",
+    "events": "id",
+    "inventory_items": "id",
+    "order_items": "id",
+    "orders": "order_id",
+    "products": "id",
+    "users": "id",
+}
+
+# Low-cardinality string columns: dictionary-encoded in Arrow with dictionary_encode
+# set, and stored as DuckDB ENUMs with duckdb_types="narrow"
+table_enum_columns: Dict[str, List[str]] = {
+    "distribution_centers": [],
+    "events": ["browser", "traffic_source", "event_type"],
+    "inventory_items": ["product_category", "product_department"],
+    "order_items": ["status"],
+    "orders": ["status", "gender"],
+    "products": ["category", "department"],
+    "users": ["gender", "country", "traffic_source"],
+}
+
 
 class TableValidationError(Exception):
     """Custom exception for DataFrame validation errors."""
 
-def validate_table(table: pa.Table, table_name: str):
+
+# Validation processes are never forked from the pipeline process: forking once
+# gRPC, DuckDB or pipelined worker threads are running can deadlock the children.
+_VALIDATION_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Rows flagged by the vectorized pass are re-validated with Pydantic in slices
+# of this size so a badly broken table never materializes as one Python list.
+FALLBACK_BATCH_SIZE = 65_536
+
+
+class ColumnRule(BaseModel):
+    """
+    Column-level constraints derived from a Pydantic model field.
+
+    A rule with ``kind=None`` cannot be checked with Arrow compute kernels, so
+    every non-null value of that column is left to Pydantic.
+    """
+
+    name: str
+    kind: Optional[str] = None  # int, float, str, bool, datetime, model
+    nullable: bool = False
+    required: bool = True
+    ge: Optional[Any] = None
+    gt: Optional[Any] = None
+    le: Optional[Any] = None
+    lt: Optional[Any] = None
+    allowed: Optional[List[Any]] = None
+    children: Dict[str, "ColumnRule"] = Field(default_factory=dict)
+
+
+_KIND_BY_TYPE = {
+    bool: "bool",
+    int: "int",
+    float: "float",
+    str: "str",
+    datetime: "datetime",
+}
+
+_ARROW_TYPE_CHECKS = {
+    "bool": pa.types.is_boolean,
+    "int": pa.types.is_integer,
+    "float": lambda t: pa.types.is_integer(t) or pa.types.is_floating(t),
+    "str": lambda t: pa.types.is_string(t) or pa.types.is_large_string(t),
+    "datetime": pa.types.is_timestamp,
+    "model": pa.types.is_struct,
+}
+
+
+def _column_rule(name: str, field) -> ColumnRule:
+    rule = ColumnRule(name=name, required=field.is_required())
+    annotation = field.annotation
+
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        rule.nullable = len(args) < len(get_args(annotation))
+        annotation = args[0] if len(args) == 1 else None
+
+    if get_origin(annotation) is Literal:
+        rule.allowed = list(get_args(annotation))
+        annotation = type(rule.allowed[0])
+    elif isinstance(annotation, type) and issubclass(annotation, Enum):
+        rule.allowed = [member.value for member in annotation]
+        annotation = type(rule.allowed[0])
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        rule.kind = None if has_model_validators(annotation) else "model"
+        rule.children = derive_column_rules(annotation)
+    else:
+        rule.kind = _KIND_BY_TYPE.get(annotation)
+
+    for constraint in field.metadata:
+        for bound in ("ge", "gt", "le", "lt"):
+            if isinstance(constraint, getattr(annotated_types, bound.capitalize())):
+                setattr(rule, bound, getattr(constraint, bound))
+                break
+        else:
+            # max_length, pattern, validator functions...: only Pydantic can check them
+            rule.kind = None
+    return rule
+
+
+def has_model_validators(model: Type[BaseModel]) -> bool:
+    """Whether a model defines validators over whole rows, which no column rule can mirror."""
+    decorators = model.__pydantic_decorators__
+    return bool(decorators.model_validators or decorators.root_validators)
+
+
+def _field_validated_names(model: Type[BaseModel]) -> set:
+    decorators = model.__pydantic_decorators__
+    names = set()
+    for decorator in (*decorators.field_validators.values(), *decorators.validators.values()):
+        names.update(decorator.info.fields)
+    return names
+
+
+@lru_cache(maxsize=None)
+def derive_column_rules(model: Type[BaseModel]) -> Dict[str, ColumnRule]:
+    """
+    Derive per-column validation rules from a Pydantic model.
+
+    Args:
+        model (Type[BaseModel]): The model describing one row of the table.
+
+    Returns:
+        Dict[str, ColumnRule]: Rules keyed by column name.
+    """
+    rules = {
+        name: _column_rule(name, field) for name, field in model.model_fields.items()
+    }
+    validated = _field_validated_names(model)
+    for name, rule in rules.items():
+        if name in validated or "*" in validated:
+            rule.kind = None
+    return rules
+
+
+def _suspect_mask(column, rule: ColumnRule):
+    """Return a null-free boolean mask of rows that may violate ``rule``."""
+    if pa.types.is_dictionary(column.type):
+        column = pc.cast(column, column.type.value_type)
+
+    is_valid = pc.is_valid(column)
+    mask = pc.is_null(column) if not rule.nullable else None
+
+    def add(condition):
+        nonlocal mask
+        condition = pc.fill_null(pc.and_(is_valid, condition), False)
+        mask = condition if mask is None else pc.or_(mask, condition)
+
+    if pa.types.is_null(column.type):
+        return mask
+
+    type_check = _ARROW_TYPE_CHECKS.get(rule.kind)
+    if type_check is None or not type_check(column.type):
+        # Pydantic's lax mode may still coerce these values; let it decide.
+        add(is_valid)
+        return mask
+
+    try:
+        for bound, kernel in (
+            ("ge", pc.less),
+            ("gt", pc.less_equal),
+            ("le", pc.greater),
+            ("lt", pc.greater_equal),
+        ):
+            value = getattr(rule, bound)
+            if value is not None:
+                add(kernel(column, value))
+        if rule.allowed is not None:
+            add(pc.invert(pc.is_in(column, value_set=pa.array(rule.allowed))))
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+        add(is_valid)
+
+    if rule.kind == "model":
+        field_names = {column.type.field(i).name for i in range(column.type.num_fields)}
+        for child in rule.children.values():
+            if child.name not in field_names:
+                if child.required:
+                    add(is_valid)
+                continue
+            child_mask = _suspect_mask(pc.struct_field(column, child.name), child)
+            if child_mask is not None:
+                add(child_mask)
+    return mask
+
+
+def find_invalid_rows(table: pa.Table, rules: Dict[str, ColumnRule]) -> pa.Array:
+    """
+    Flag rows that may violate the given rules using Arrow compute kernels.
+
+    The check is conservative: every row Pydantic would reject is flagged, but
+    flagged rows may still pass once Pydantic applies its own coercion. Columns
+    with constraints or validators the rules cannot express (``kind=None``) flag
+    all their non-null values; models with row-level validators are not checked
+    here at all (see ``has_model_validators``).
+
+    Args:
+        table (pa.Table): The table to check.
+        rules (Dict[str, ColumnRule]): Rules as returned by ``derive_column_rules``.
+
+    Returns:
+        pa.Array: Sorted indices of the flagged rows.
+    """
+    mask = None
+    for rule in rules.values():
+        if rule.name in table.column_names:
+            column_mask = _suspect_mask(table[rule.name], rule)
+        elif rule.required:
+            return pa.array(range(table.num_rows), type=pa.uint64())
+        else:
+            continue
+        if column_mask is not None:
+            mask = column_mask if mask is None else pc.or_(mask, column_mask)
+
+    if mask is None or not pc.any(mask).as_py():
+        return pa.array([], type=pa.uint64())
+    if isinstance(mask, pa.ChunkedArray):
+        mask = mask.combine_chunks()
+    return pc.indices_nonzero(mask)
+
+
+class ValidationPolicy(BaseModel):
+    """
+    How failing rows are reported.
+
+    With ``fail_fast`` validation stops at the first failing row. Otherwise every
+    failing row is reported with its Pydantic error codes, but the full error
+    text is only kept for a ``sample_rate`` fraction of them, up to
+    ``max_errors`` messages per table (None keeps them all).
+    """
+
+    fail_fast: bool = False
+    max_errors: Optional[int] = 100
+    sample_rate: float = 1.0
+
+
+# (global row index, comma-separated Pydantic error types, error text if kept)
+RowFailure = Tuple[int, str, Optional[str]]
+
+
+def _sampled(row_index: int, sample_rate: float) -> bool:
+    """Deterministic per-row sampling, so serial and parallel runs keep the same messages."""
+    if sample_rate >= 1:
+        return True
+    return (row_index * 2654435761) % 2**32 < sample_rate * 2**32
+
+
+def _rows_failing_model(
+    table: pa.Table, model: Type[BaseModel], policy: ValidationPolicy
+) -> List[RowFailure]:
+    """Instantiate ``model`` for each row of ``table``, whose ``__row_index`` column holds global indices."""
+    indices = table["__row_index"].to_pylist()
+    failures, kept = [], 0
+    for i, row in zip(indices, table.drop_columns(["__row_index"]).to_pylist()):
+        try:
+            model(**row)
+        except ValidationError as e:
+            message = None
+            if (policy.max_errors is None or kept < policy.max_errors) and _sampled(i, policy.sample_rate):
+                message, kept = str(e), kept + 1
+            failures.append((i, ",".join(sorted({error["type"] for error in e.errors()})), message))
+            if policy.fail_fast:
+                break
+    return failures
+
+
+def _validate_ipc_slice(
+    payload: pa.Buffer, model: Type[BaseModel], columns: Optional[tuple], policy: ValidationPolicy
+) -> List[RowFailure]:
+    """Process pool entry point: validate rows shipped as an Arrow IPC stream."""
+    if columns is not None:
+        model = project_model(model, columns)
+    return _rows_failing_model(pa.ipc.open_stream(payload).read_all(), model, policy)
+
+
+def _to_ipc(table: pa.Table) -> pa.Buffer:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def find_failing_rows(
+    table: pa.Table,
+    model: Type[BaseModel],
+    row_offset: int = 0,
+    columns: Optional[List[str]] = None,
+    workers: int = 1,
+    policy: Optional[ValidationPolicy] = None,
+) -> List[RowFailure]:
+    """
+    Validate a table against a model, instantiating the model only for rows
+    flagged by ``find_invalid_rows``.
+
+    With ``workers > 1`` and more flagged rows than fit in one fallback slice,
+    the slices are serialized as Arrow IPC streams and validated in a process
+    pool, so no Python row objects are pickled and Pydantic runs on several cores.
+
+    Args:
+        table (pa.Table): The table to validate.
+        model (Type[BaseModel]): The model describing one row of the table.
+        row_offset (int, optional): Added to reported row indices when ``table``
+            is a slice of a larger table. Defaults to 0.
+        columns (List[str], optional): Only check these fields of the model. Defaults to None.
+        workers (int, optional): Processes used for the Pydantic fallback. Defaults to 1.
+        policy (ValidationPolicy, optional): Bounds on the reported failures. Defaults to ValidationPolicy().
+
+    Returns:
+        List[RowFailure]: One entry per failing row, in row order, using global row indices.
+    """
+    policy = policy or ValidationPolicy()
+    columns = tuple(columns) if columns is not None else None
+    row_model = project_model(model, columns) if columns is not None else model
+    if has_model_validators(row_model):
+        suspects = pa.array(range(table.num_rows), type=pa.uint64())
+    else:
+        suspects = find_invalid_rows(table, derive_column_rules(row_model))
+    if len(suspects) == 0:
+        return []
+
+    flagged = table.take(suspects).append_column(
+        "__row_index", pc.add(suspects, pa.scalar(row_offset, pa.uint64()))
+    )
+    slices = [
+        flagged.slice(offset, FALLBACK_BATCH_SIZE)
+        for offset in range(0, flagged.num_rows, FALLBACK_BATCH_SIZE)
+    ]
+    failures = []
+    if workers <= 1 or len(slices) == 1:
+        for rows in slices:
+            failures.extend(_rows_failing_model(rows, row_model, policy))
+            if policy.fail_fast and failures:
+                break
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(slices)), mp_context=_VALIDATION_MP_CONTEXT
+        ) as executor:
+            for slice_failures in executor.map(
+                _validate_ipc_slice,
+                [_to_ipc(rows) for rows in slices],
+                [model] * len(slices),
+                [columns] * len(slices),
+                [policy] * len(slices),
+            ):
+                failures.extend(slice_failures)
+
+    if policy.fail_fast:
+        return failures[:1]
+    # Slices are validated independently, so apply the message budget to the merged list
+    kept = 0
+    for n, (i, codes, message) in enumerate(failures):
+        if message is not None:
+            if policy.max_errors is not None and kept >= policy.max_errors:
+                failures[n] = (i, codes, None)
+            kept += 1
+    return failures
+
+
+def collect_validation_errors(
+    table: pa.Table,
+    model: Type[BaseModel],
+    row_offset: int = 0,
+    columns: Optional[List[str]] = None,
+    workers: int = 1,
+) -> List[str]:
+    """
+    Validate a table against a model and describe every failing row.
+
+    Args:
+        table (pa.Table): The table to validate.
+        model (Type[BaseModel]): The model describing one row of the table.
+        row_offset (int, optional): Added to reported row indices when ``table``
+            is a slice of a larger table. Defaults to 0.
+        columns (List[str], optional): Only check these fields of the model. Defaults to None.
+        workers (int, optional): Processes used for the Pydantic fallback. Defaults to 1.
+
+    Returns:
+        List[str]: One message per failing row, using global row indices.
+    """
+    failures = find_failing_rows(
+        table, model, row_offset, columns, workers, ValidationPolicy(max_errors=None)
+    )
+    return [f"Row {i} failed validation: {message}" for i, _, message in failures]
+
+
+@lru_cache(maxsize=None)
+def project_model(model: Type[BaseModel], columns: tuple) -> Type[BaseModel]:
+    """
+    Restrict a model to a subset of its fields, for tables extracted with a
+    column projection.
+
+    Args:
+        model (Type[BaseModel]): The model describing one row of the full table.
+        columns (tuple): The selected column names.
+
+    Returns:
+        Type[BaseModel]: A model with only the selected fields.
+    """
+    fields = {
+        name: (field.annotation, field)
+        for name, field in model.model_fields.items()
+        if name in columns
+    }
+    return create_model(f"{model.__name__}Projection", **fields)
+
+
+def _table_model(table_name: str) -> Type[BaseModel]:
+    model = table_model_mapping.get(table_name)
+    if not model:
+        raise ValueError(f"No model mapping found for table: {table_name}")
+    return model
+
+
+def _error_report(failures: List[RowFailure]) -> str:
+    lines = [f"Row {i} failed validation: {message}" for i, _, message in failures if message is not None]
+    if len(lines) < len(failures):
+        lines.append(f"... {len(failures) - len(lines)} more failing rows not shown")
+    return "\n".join(lines)
+
+
+def validate_table(
+    table: pa.Table,
+    table_name: str,
+    row_offset: int = 0,
+    columns: Optional[List[str]] = None,
+    workers: int = 1,
+    policy: Optional[ValidationPolicy] = None,
+):
     """
     Validate the data in a table using a corresponding model.
 
+    Column types, nullability, ranges and enums are checked over whole chunks
+    first; Pydantic is only invoked on the rows flagged by that pass.
+
     Args:
         table (pa.Table): The table to be validated.
         table_name (str): The name of the table.
+        row_offset (int, optional): Position of ``table`` within the full table,
+            used to report global row indices for streamed batches. Defaults to 0.
+        columns (List[str], optional): Columns selected at extraction. When given,
+            only those fields of the model are checked. Defaults to None.
+        workers (int, optional): Processes used for the Pydantic fallback on
+            large failing tables. Defaults to 1.
+        policy (ValidationPolicy, optional): Bounds the error text carried by the
+            exception. Defaults to ValidationPolicy().
 
     Raises:
         ValueError: If no model mapping is found for the given table name.
@@ -141,20 +656,124 @@ def validate_table(table: pa.Table, table_name: str):
     Returns:
         None
     """
-    model = table_model_mapping.get(table_name)
-    if not model:
-        raise ValueError(f"No model mapping found for table: {table_name}")
+    failures = find_failing_rows(
+        table, _table_model(table_name), row_offset, columns, workers, policy
+    )
+    if failures:
+        raise TableValidationError(
+            f"Table validation failed with the following errors:\n{_error_report(failures)}"
+        )
 
-    errors = []
-    for i in range(table.num_rows):
-        row = {column: table[column][i].as_py() for column in table.column_names}
-        try:
-            model(**row)
-        except ValidationError as e:
-            errors.append(f"Row {i} failed validation: {e}")
 
-    if errors:
-        error_message = "\n".join(errors)
+def split_invalid_rows(
+    table: pa.Table,
+    table_name: str,
+    row_offset: int = 0,
+    columns: Optional[List[str]] = None,
+    workers: int = 1,
+    policy: Optional[ValidationPolicy] = None,
+) -> Tuple[pa.Table, pa.Table]:
+    """
+    Separate the rows of a table that pass validation from those that fail it.
+
+    Args:
+        table (pa.Table): The table to be validated.
+        table_name (str): The name of the table.
+        row_offset (int, optional): Position of ``table`` within the full table. Defaults to 0.
+        columns (List[str], optional): Columns selected at extraction. Defaults to None.
+        workers (int, optional): Processes used for the Pydantic fallback. Defaults to 1.
+        policy (ValidationPolicy, optional): Bounds on the kept error text. Defaults to ValidationPolicy().
+
+    Raises:
+        ValueError: If no model mapping is found for the given table name.
+        TableValidationError: If ``policy.fail_fast`` is set and a row fails.
+
+    Returns:
+        Tuple[pa.Table, pa.Table]: The valid rows, and the rejected rows with
+        ``_row_index``, ``_error_codes`` and ``_error_message`` columns appended.
+    """
+    policy = policy or ValidationPolicy()
+    failures = find_failing_rows(
+        table, _table_model(table_name), row_offset, columns, workers, policy
+    )
+    if failures and policy.fail_fast:
         raise TableValidationError(
-            f"Table validation failed with the following errors:\n{error_message}"
-        )
\ No newline at end of file
+            f"Table validation failed with the following errors:\n{_error_report(failures)}"
+        )
+
+    indices, codes, messages = zip(*failures) if failures else ((), (), ())
+    local = pa.array([i - row_offset for i in indices], type=pa.uint64())
+    rejected = (
+        table.take(local)
+        .append_column("_row_index", pa.array(indices, type=pa.uint64()))
+        .append_column("_error_codes", pa.array(codes, type=pa.string()))
+        .append_column("_error_message", pa.array(messages, type=pa.string()))
+    )
+    if not failures:
+        # Clean tables are returned as is, without copying their buffers
+        return table, rejected
+    keep = np.ones(table.num_rows, dtype=bool)
+    keep[local.to_numpy()] = False
+    return table.filter(pa.array(keep)), rejected
+
+
+_DUCKDB_TYPES = {
+    "bool": "BOOLEAN",
+    "int": "BIGINT",
+    "float": "DOUBLE",
+    "str": "VARCHAR",
+    "datetime": "TIMESTAMP WITH TIME ZONE",
+}
+
+# Narrow types: thelook ids and counts fit in 32 bits
+_NARROW_DUCKDB_TYPES = {**_DUCKDB_TYPES, "int": "INTEGER"}
+
+
+def enum_type_name(table_name: str, column: str) -> str:
+    """Name of the DuckDB ENUM type backing a low-cardinality column."""
+    return f"{table_name}_{column}_enum"
+
+
+def duckdb_ddl(
+    table_name: str,
+    columns: Optional[List[str]] = None,
+    narrow: bool = False,
+    enum_columns: Optional[List[str]] = None,
+) -> str:
+    """
+    Generate the DuckDB DDL of an ecommerce table from its Pydantic model.
+
+    Args:
+        table_name (str): The name of the table.
+        columns (List[str], optional): Only include these columns, e.g. for projected
+            extracts. Defaults to None.
+        narrow (bool, optional): Use 32-bit integers. Defaults to False.
+        enum_columns (List[str], optional): Columns typed with the ENUM named by
+            ``enum_type_name``, which must already exist. Defaults to None.
+
+    Raises:
+        ValueError: If no model mapping is found for the given table name, or a
+            field has no DuckDB type.
+
+    Returns:
+        str: A ``CREATE TABLE IF NOT EXISTS`` statement.
+    """
+    types = _NARROW_DUCKDB_TYPES if narrow else _DUCKDB_TYPES
+    enum_columns = enum_columns or []
+    definitions = []
+    for name, rule in derive_column_rules(_table_model(table_name)).items():
+        if columns is not None and name not in columns:
+            continue
+        if name in enum_columns:
+            column_type = enum_type_name(table_name, name)
+        elif rule.kind in types:
+            column_type = types[rule.kind]
+        else:
+            raise ValueError(f"No DuckDB type for column {name} of table {table_name}")
+        definitions.append(f"{name} {column_type}")
+    columns_ddl = ",\n        ".join(definitions)
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table_name} (
+        {columns_ddl}
+    )
+    """
@@ -1,26 +1,502 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from loguru import logger
 import fire
-import os
 import duckdb
+import pyarrow as pa
 
 from bigquery import (
     get_bigquery_client,
     get_bigquery_results,
+    get_bigquery_storage_client,
+    stream_bigquery_batches,
     build_ecommerce_query,
+    table_columns,
 )
 from duck import (
+    append_batches_to_duckdb,
     create_table_from_pyarrow_tables,
-    load_aws_credentials,
-    write_to_s3_from_duckdb,
-    write_to_md_from_duckdb,
-    connect_to_md,
 )
 from models import (
     TableValidationError,
     EcommerceJobParameters,
-    validate_table
+    table_primary_keys,
+    table_watermark_columns,
+    split_invalid_rows,
+    ValidationPolicy,
 )
+from sink import (
+    get_destinations,
+    init_destination,
+    open_destinations,
+    requires_materialization,
+    sink_tables,
+    sink_to_destination,
+    QuarantineWriter,
+    write_quarantine,
+)
+from cache import ResultCache
+from encoding import dictionary_encode_batches, dictionary_encode_table
+from metrics import (
+    finish_run,
+    record,
+    record_cardinality,
+    start_run,
+    track,
+)
+from state import (
+    RunManifest,
+    load_watermarks,
+    run_fingerprint,
+    save_watermarks,
+    update_watermark,
+)
+
+
+def incremental_sink_options(
+    table_name: str, watermarks: Dict[str, dict], run_id: str
+) -> dict:
+    """
+    Sink options for a table extracted as a delta above a previous watermark.
+
+    File sinks write the delta next to the previous files instead of
+    overwriting them, and MotherDuck merges it on the table's primary key.
+    Tables without a previous watermark were extracted in full and keep the
+    default (overwrite) behavior.
+
+    Args:
+        table_name (str): The name of the table.
+        watermarks (Dict[str, dict]): Watermarks loaded before extraction.
+        run_id (str): Identifier of the current run, used to name delta files.
+
+    Returns:
+        dict: Keyword arguments for ``sink_to_destination``.
+    """
+    if table_name not in watermarks:
+        return {}
+    return {"file_suffix": f"_{run_id}", "merge_key": table_primary_keys.get(table_name)}
+
+
+def validation_policy(params: EcommerceJobParameters) -> ValidationPolicy:
+    """Build the validation policy of a job from its parameters."""
+    return ValidationPolicy(
+        fail_fast=params.validation_fail_fast,
+        max_errors=params.max_validation_errors,
+        sample_rate=params.validation_sample_rate,
+    )
+
+
+def _log_rejected(table_name: str, rejected: pa.Table):
+    codes = rejected["_error_codes"].value_counts().to_pylist()
+    summary = ", ".join(f"{c['values']}={c['counts']}" for c in codes)
+    logger.error(f"{rejected.num_rows} rows of {table_name} failed validation ({summary})")
+    for i, message in zip(rejected["_row_index"].to_pylist(), rejected["_error_message"].to_pylist()):
+        if message is not None:
+            logger.debug(f"Row {i} of {table_name} failed validation: {message}")
+
+
+def validate_batches(
+    batches: Iterator[pa.RecordBatch],
+    table_name: str,
+    columns: Optional[List[str]] = None,
+    workers: int = 1,
+    policy: Optional[ValidationPolicy] = None,
+    on_rejected: Optional[Callable[[pa.Table], None]] = None,
+    errors: Optional[List[TableValidationError]] = None,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Validate streamed record batches, dropping failing rows.
+
+    The rejected rows of each batch are passed to ``on_rejected`` with their global row indices.
+    With ``policy.fail_fast`` the first batch containing a failing row raises
+    ``TableValidationError``, which aborts the consumer of the stream; batches
+    already yielded are not recalled. Consumers such as DuckDB re-raise it as
+    their own error type, so it is also appended to ``errors``.
+
+    Args:
+        batches (Iterator[pa.RecordBatch]): The record batches to validate.
+        table_name (str): The name of the table the batches belong to.
+        columns (List[str], optional): Columns selected at extraction. Defaults to None.
+        workers (int, optional): Processes used for the Pydantic fallback. Defaults to 1.
+        policy (ValidationPolicy, optional): How failures are handled. Defaults to ValidationPolicy().
+        on_rejected (Callable[[pa.Table], None], optional): Receives the rejected rows of each
+            batch as they are found. Defaults to None.
+        errors (List[TableValidationError], optional): Collects the fail-fast error. Defaults to None.
+
+    Raises:
+        TableValidationError: If ``policy.fail_fast`` is set and a row fails.
+
+    Yields:
+        pa.RecordBatch: The valid rows of each input batch.
+    """
+    row_offset, num_bytes, num_batches, elapsed = 0, 0, 0, 0.0
+    for batch in batches:
+        start_time = time.perf_counter()
+        try:
+            valid, failed = split_invalid_rows(
+                pa.Table.from_batches([batch]), table_name, row_offset, columns, workers, policy
+            )
+        except TableValidationError as e:
+            logger.error(f"Validation failed for table: {table_name}, stopping its stream: {e}")
+            if errors is not None:
+                errors.append(e)
+            raise
+        finally:
+            elapsed += time.perf_counter() - start_time
+            row_offset += batch.num_rows
+            num_bytes += batch.nbytes
+            num_batches += 1
+        if failed.num_rows and on_rejected is not None:
+            on_rejected(failed)
+        yield from valid.to_batches() if valid.num_rows else [batch.slice(0, 0)]
+    record("validate", table_name, elapsed, row_offset, num_bytes, num_batches)
+
+
+def track_watermark(
+    batches: Iterator[pa.RecordBatch], watermarks: Dict[str, dict], table_name: str
+) -> Iterator[pa.RecordBatch]:
+    """
+    Raise a table's watermark as record batches stream through.
+
+    Args:
+        batches (Iterator[pa.RecordBatch]): The record batches.
+        watermarks (Dict[str, dict]): Watermarks keyed by table name, updated in place.
+        table_name (str): The name of the table the batches belong to.
+
+    Yields:
+        pa.RecordBatch: The input batches, unchanged.
+    """
+    column = table_watermark_columns[table_name]
+    for batch in batches:
+        if batch.num_rows:
+            update_watermark(watermarks, table_name, column, batch)
+        yield batch
+
+
+@contextmanager
+def _raise_validation_errors(errors: List[TableValidationError]):
+    """Fail a table whose stream was stopped by validation, so its watermark is not saved."""
+    try:
+        yield
+    except Exception:
+        if errors:
+            raise errors[0]
+        raise
+
+
+def count_batches(
+    batches: Iterator[pa.RecordBatch], sizes: Dict[str, Tuple[int, int]], table_name: str
+) -> Iterator[pa.RecordBatch]:
+    """
+    Count the rows and Arrow bytes of a table as record batches stream through.
+
+    Args:
+        batches (Iterator[pa.RecordBatch]): The record batches.
+        sizes (Dict[str, Tuple[int, int]]): Rows and bytes keyed by table name, updated in place.
+        table_name (str): The name of the table the batches belong to.
+
+    Yields:
+        pa.RecordBatch: The input batches, unchanged.
+    """
+    rows, num_bytes = 0, 0
+    for batch in batches:
+        rows += batch.num_rows
+        num_bytes += batch.nbytes
+        sizes[table_name] = (rows, num_bytes)
+        yield batch
+
+
+def stream_tables(
+    conn,
+    queries: List[str],
+    params: EcommerceJobParameters,
+    bigquery_client,
+    watermarks: Dict[str, dict] = None,
+    run_id: str = "",
+    bqstorage_client=None,
+):
+    """
+    Stream each table from BigQuery through validation into its sinks.
+
+    With a single file destination (local or s3) the validated stream is
+    registered as a view and copied straight to the sink. Otherwise it is
+    appended into DuckDB, sunk, and dropped before the next table starts.
+
+    Args:
+        conn: The DuckDB connection object.
+        queries (List[str]): The BigQuery queries, one per table.
+        params (EcommerceJobParameters): The parameters for the Ecommerce job.
+        bigquery_client: The BigQuery client object.
+        watermarks (Dict[str, dict], optional): Watermarks loaded before extraction, only used
+            for incremental runs. Defaults to None.
+        run_id (str, optional): Identifier of the current run. Defaults to "".
+        bqstorage_client (optional): The shared BigQuery Storage read client. Defaults to None.
+
+    Returns:
+        None
+    """
+    watermarks = watermarks if watermarks is not None else {}
+    previous_watermarks = dict(watermarks)
+    destinations = get_destinations(params)
+    direct = len(destinations) == 1 and destinations[0] in ("local", "s3")
+    if direct:
+        # Registered readers are only visible to this connection, not to cursors
+        init_destination(conn, destinations[0], params)
+    else:
+        cursors = open_destinations(conn, params)
+
+    for query, table_name in zip(queries, params.table_names):
+        batches = stream_bigquery_batches(
+            query=query,
+            table_name=table_name,
+            bigquery_client=bigquery_client,
+            bqstorage_client=bqstorage_client,
+            batch_rows=params.stream_batch_rows,
+            max_queue_size=params.stream_queue_size,
+        )
+        if params.dictionary_encode != "off":
+            batches = dictionary_encode_batches(
+                batches,
+                table_name,
+                params.dictionary_encode,
+                params.dictionary_max_ratio,
+                params.dictionary_max_value_bytes,
+            )
+        first_batch = next(batches, None)
+        if first_batch is None or (params.incremental and first_batch.num_rows == 0):
+            logger.warning(f"No data returned for table: {table_name}")
+            continue
+
+        def chained(first=first_batch, rest=batches):
+            yield first
+            yield from rest
+
+        quarantine = QuarantineWriter(table_name, params.quarantine_path, run_id)
+        validation_errors = []
+
+        def on_rejected(failed, table_name=table_name, quarantine=quarantine):
+            _log_rejected(table_name, failed)
+            quarantine.write(failed)
+
+        batches = validate_batches(
+            chained(),
+            table_name,
+            table_columns(params, table_name),
+            params.validation_workers,
+            validation_policy(params),
+            on_rejected,
+            validation_errors,
+        )
+        if params.incremental:
+            batches = track_watermark(batches, watermarks, table_name)
+        sizes = {}
+        batches = count_batches(batches, sizes, table_name)
+        reader = pa.RecordBatchReader.from_batches(first_batch.schema, batches)
+        sink_options = (
+            incremental_sink_options(table_name, previous_watermarks, run_id)
+            if params.incremental
+            else {}
+        )
+        with quarantine, _raise_validation_errors(validation_errors):
+            if direct:
+                conn.register(table_name, reader)
+                with track(f"sink:{destinations[0]}", table_name) as metrics:
+                    sink_to_destination(conn, destinations[0], table_name, params, **sink_options)
+                    metrics.rows, metrics.bytes = sizes.get(table_name, (0, 0))
+                conn.unregister(table_name)
+            else:
+                append_batches_to_duckdb(conn, table_name, reader, params.duckdb_types)
+                sink_tables(
+                    cursors,
+                    [table_name],
+                    params,
+                    {table_name: sink_options},
+                    params.sink_workers,
+                    table_sizes=sizes,
+                )
+                conn.execute(f"DROP TABLE {table_name}")
+        if params.incremental:
+            save_watermarks(params.state_path, watermarks)
+
+
+def result_cache(params: EcommerceJobParameters) -> Optional[ResultCache]:
+    """Open the extraction cache of a job, if it has one."""
+    if not params.cache_dir:
+        return None
+    return ResultCache(params.cache_dir, params.cache_ttl_seconds, params.cache_max_bytes)
+
+
+def prepare_table(
+    table_name: str,
+    pa_tbl: pa.Table,
+    params: EcommerceJobParameters,
+    run_id: str = "",
+    manifest: Optional[RunManifest] = None,
+) -> Optional[pa.Table]:
+    """
+    Encode and validate an extracted table, quarantining its rejected rows.
+
+    Args:
+        table_name (str): The name of the table.
+        pa_tbl (pa.Table): The extracted table.
+        params (EcommerceJobParameters): The parameters for the Ecommerce job.
+        run_id (str, optional): Identifier of the current run. Defaults to "".
+        manifest (RunManifest, optional): Records the extract and validate steps. Defaults to None.
+
+    Returns:
+        Optional[pa.Table]: The valid rows, or None if the table was dropped by a fail-fast policy.
+    """
+    if manifest:
+        manifest.mark_done(table_name, "extract")
+    if params.dictionary_encode != "off":
+        pa_tbl, cardinality = dictionary_encode_table(
+            pa_tbl,
+            table_name,
+            params.dictionary_encode,
+            params.dictionary_max_ratio,
+            max_value_bytes=params.dictionary_max_value_bytes,
+        )
+        record_cardinality(cardinality)
+    # Validate the PyArrow table with the respective model, keeping only valid rows
+    try:
+        logger.info(f"Validating table: {table_name}")
+        with track("validate", table_name) as metrics:
+            metrics.rows, metrics.bytes = pa_tbl.num_rows, pa_tbl.nbytes
+            valid, rejected = split_invalid_rows(
+                pa_tbl,
+                table_name,
+                columns=table_columns(params, table_name),
+                workers=params.validation_workers,
+                policy=validation_policy(params),
+            )
+    except TableValidationError as e:
+        logger.error(f"Validation failed for table: {table_name} with error: {e}")
+        return None
+
+    if rejected.num_rows:
+        _log_rejected(table_name, rejected)
+        write_quarantine(rejected, table_name, params.quarantine_path, run_id)
+    else:
+        logger.info(f"Validation successful for table: {table_name}")
+    if manifest:
+        manifest.mark_done(table_name, "validate")
+    return valid
+
+
+def pipeline_tables(
+    conn,
+    queries: List[str],
+    params: EcommerceJobParameters,
+    bigquery_client,
+    watermarks: Dict[str, dict] = None,
+    run_id: str = "",
+    manifest: Optional[RunManifest] = None,
+    bqstorage_client=None,
+):
+    """
+    Run each table independently through extract, validate, load and sink.
+
+    Up to ``params.max_in_flight`` tables are processed at once, each on its
+    own DuckDB cursors, so a small table can reach its destinations while a
+    large one is still downloading. A table's memory is released once it has
+    been sunk, which bounds the number of extracted tables held at a time.
+
+    Args:
+        conn: The DuckDB connection object.
+        queries (List[str]): The BigQuery queries, one per table.
+        params (EcommerceJobParameters): The parameters for the Ecommerce job.
+        bigquery_client: The BigQuery client object.
+        watermarks (Dict[str, dict], optional): Watermarks loaded before extraction, only used
+            for incremental runs. Defaults to None.
+        run_id (str, optional): Identifier of the current run. Defaults to "".
+        manifest (RunManifest, optional): Manifest of a resumable run. Defaults to None.
+        bqstorage_client (optional): The shared BigQuery Storage read client. Defaults to None.
+
+    Returns:
+        None
+    """
+    watermarks = watermarks if watermarks is not None else {}
+    previous_watermarks = dict(watermarks)
+    materialize = requires_materialization(params)
+    watermark_lock = threading.Lock()
+    cache = result_cache(params)
+    # Once per run: the per-table cursors share the connection's credentials and attachments
+    for destination in get_destinations(params):
+        init_destination(conn, destination, params)
+
+    def process(query: str, table_name: str):
+        cursor = conn.cursor()
+        pa_tbl = None
+        if not (manifest and manifest.is_done(table_name, "load")):
+            pa_tbl = get_bigquery_results(
+                [query],
+                [table_name],
+                bigquery_client,
+                params.extract_workers,
+                params.shards,
+                bqstorage_client,
+                cache,
+            ).get(table_name)
+            pa_tbl = prepare_table(table_name, pa_tbl, params, run_id, manifest) if pa_tbl is not None else None
+            if pa_tbl is None:
+                return
+            if materialize:
+                create_table_from_pyarrow_tables(cursor, {table_name: pa_tbl}, params.duckdb_types)
+                if manifest:
+                    manifest.mark_done(table_name, "load")
+
+        tables = {} if pa_tbl is None else {table_name: pa_tbl}
+        if params.incremental and _num_rows(cursor, tables, table_name) == 0:
+            logger.info(f"No new rows for table: {table_name}")
+            return
+        sink_options = (
+            {table_name: incremental_sink_options(table_name, previous_watermarks, run_id)}
+            if params.incremental
+            else {}
+        )
+        cursors = open_destinations(cursor, params, None if materialize else tables, initialize=False)
+        try:
+            sink_tables(
+                cursors,
+                [table_name],
+                params,
+                sink_options,
+                params.sink_workers,
+                manifest,
+                {name: (tbl.num_rows, tbl.nbytes) for name, tbl in tables.items()},
+            )
+        finally:
+            for destination_cursor in cursors.values():
+                destination_cursor.close()
+
+        if params.incremental:
+            # Only advance the watermark once the delta has been sunk
+            column = table_watermark_columns[table_name]
+            if pa_tbl is not None:
+                data = pa_tbl
+            else:
+                data = cursor.execute(f"SELECT max({column}) AS {column} FROM {table_name}").arrow()
+            with watermark_lock:
+                update_watermark(watermarks, table_name, column, data)
+                save_watermarks(params.state_path, watermarks)
+
+    with ThreadPoolExecutor(max_workers=max(1, params.max_in_flight)) as executor:
+        futures = {
+            executor.submit(process, query, table_name): table_name
+            for query, table_name in zip(queries, params.table_names)
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Pipeline failed for table: {futures[future]} with error: {e}")
+                for pending in futures:
+                    pending.cancel()
+                raise
 
 
 def main(params: EcommerceJobParameters):
@@ -34,64 +510,130 @@ def main(params: EcommerceJobParameters):
         None
     """
     start_time = datetime.now()
+    # Both clients are cached per process and shared by every table of the run
     bigquery_client = get_bigquery_client(project_name=params.gcp_project)
-    conn = duckdb.connect()
+    bqstorage_client = get_bigquery_storage_client()
+    # Streamed tables are dropped after each sink and never resumed, so they are not staged
+    staging_database = None if params.streaming else params.staging_database
+    conn = duckdb.connect(staging_database or ":memory:")
 
-    queries = build_ecommerce_query(params)  
+    run_id = start_time.strftime("%Y%m%dT%H%M%S")
+    watermarks = load_watermarks(params.state_path) if params.incremental else {}
+    queries = build_ecommerce_query(params, watermarks=watermarks)
 
-    pyarrow_tables = get_bigquery_results(
-        queries=queries,
-        table_names=params.table_names,
-        bigquery_client=bigquery_client,
-    )
+    manifest = None
+    if staging_database:
+        manifest = RunManifest.load(
+            params.manifest_path or f"{staging_database}.manifest.json",
+            run_fingerprint(queries, get_destinations(params)),
+            run_id,
+        )
+        run_id = manifest.run_id
+    start_run(run_id)
 
-    # Iterate through the returned dictionary of PyArrow tables
-    for table_name, pa_tbl in pyarrow_tables.items():
-        # Validate the PyArrow table with the respective model
-        try:
-            logger.info(f"Validating table: {table_name}")
-            validate_table(pa_tbl, table_name)
-            logger.info(f"Validation successful for table: {table_name}")
-        except TableValidationError as e:
-            logger.error(f"Validation failed for table: {table_name} with error: {e}")
-            continue  # Or handle the error as needed
+    if params.streaming:
+        stream_tables(conn, queries, params, bigquery_client, watermarks, run_id, bqstorage_client)
+    elif params.pipelined:
+        pipeline_tables(
+            conn, queries, params, bigquery_client, watermarks, run_id, manifest, bqstorage_client
+        )
+        if manifest:
+            manifest.complete()
+    else:
+        # Tables loaded into the staging database by an interrupted run are not extracted again
+        pending = [
+            (query, table_name)
+            for query, table_name in zip(queries, params.table_names)
+            if not (manifest and manifest.is_done(table_name, "load"))
+        ]
+        pyarrow_tables = get_bigquery_results(
+            queries=[query for query, _ in pending],
+            table_names=[table_name for _, table_name in pending],
+            bigquery_client=bigquery_client,
+            max_workers=params.extract_workers,
+            shards=params.shards,
+            bqstorage_client=bqstorage_client,
+            cache=result_cache(params),
+        )
 
-        # Add the PyArrow table to the dictionary with the table name as the key
-        pyarrow_tables[table_name] = pa_tbl
+        # Iterate through the returned dictionary of PyArrow tables
+        for table_name, pa_tbl in list(pyarrow_tables.items()):
+            valid = prepare_table(table_name, pa_tbl, params, run_id, manifest)
+            if valid is None:
+                del pyarrow_tables[table_name]
+            else:
+                pyarrow_tables[table_name] = valid
 
-    # Loading to DuckDB
-    create_table_from_pyarrow_tables(
-        duckdb_con=conn,
-        pyarrow_tables=pyarrow_tables,
-    )
+        # Loading to DuckDB, unless the sinks can read the Arrow tables in place
+        materialize = requires_materialization(params)
+        if materialize:
+            for table_name, pa_tbl in pyarrow_tables.items():
+                create_table_from_pyarrow_tables(
+                    duckdb_con=conn,
+                    pyarrow_tables={table_name: pa_tbl},
+                    column_types=params.duckdb_types,
+                )
+                if manifest:
+                    manifest.mark_done(table_name, "load")
 
-    for table_name in params.table_names:
-        logger.info(f"Sinking data to {params.destination}")
-        if "local" in params.destination:
-            conn.execute(f"COPY {table_name} TO '{table_name}.csv';")
+        previous_watermarks = dict(watermarks)
+        # Tables dropped by validation are not sunk; resumed ones are read from the staging database
+        loaded = [
+            t for t in params.table_names
+            if t in pyarrow_tables or (manifest and manifest.is_done(t, "load"))
+        ]
+        table_names = loaded
+        sink_options = {}
+        if params.incremental:
+            table_names = [t for t in loaded if _num_rows(conn, pyarrow_tables, t) > 0]
+            for table_name in set(loaded) - set(table_names):
+                logger.info(f"No new rows for table: {table_name}")
+            sink_options = {
+                table_name: incremental_sink_options(table_name, previous_watermarks, run_id)
+                for table_name in table_names
+            }
 
-        if "s3" in params.destination:
-            load_aws_credentials(conn, params.aws_profile)
-            write_to_s3_from_duckdb(
-                duckdb_con=conn, tables=[table_name], s3_path=params.s3_path
-            )
+        sink_tables(
+            open_destinations(conn, params, None if materialize else pyarrow_tables),
+            table_names,
+            params,
+            sink_options,
+            params.sink_workers,
+            manifest,
+            {name: (tbl.num_rows, tbl.nbytes) for name, tbl in pyarrow_tables.items()},
+        )
 
-        if "md" in params.destination:
-            connect_to_md(conn, os.environ["motherduck_token"])
-            write_to_md_from_duckdb(
-                duckdb_con=conn,
-                table=table_name,
-                local_database="local",
-                remote_database="ecommerce",
-            )
+        if params.incremental:
+            # Only advance watermarks once the deltas have been sunk
+            for table_name in table_names:
+                column = table_watermark_columns[table_name]
+                if table_name in pyarrow_tables:
+                    data = pyarrow_tables[table_name]
+                else:
+                    data = conn.execute(
+                        f"SELECT max({column}) AS {column} FROM {table_name}"
+                    ).arrow()
+                update_watermark(watermarks, table_name, column, data)
+            save_watermarks(params.state_path, watermarks)
 
+        if manifest:
+            manifest.complete()
+
+    finish_run(params.report_path)
     end_time = datetime.now()
     elapsed = (end_time - start_time).total_seconds()
     logger.info(
         f"Total job completed in {elapsed // 60} minutes and {elapsed % 60:.2f} seconds."
     )
 
+
+def _num_rows(conn, pyarrow_tables: dict, table_name: str) -> int:
+    """Row count of an extracted table, read from the staging database for resumed tables."""
+    if table_name in pyarrow_tables:
+        return pyarrow_tables[table_name].num_rows
+    return conn.execute(f"SELECT count(*) FROM {table_name}").fetchone()[0]
+
 if __name__ == "__main__":
     fire.Fire(lambda **kwargs: main(EcommerceJobParameters(
         **{k: v.split(',') if k == 'table_names' and isinstance(v, str) else v for k, v in kwargs.items()}
-    )))
\ No newline at end of file
+    )))
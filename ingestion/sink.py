@@ -0,0 +1,324 @@
+""" Helper functions for fanning DuckDB tables out to the configured destinations """
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from metrics import record, track
+from duck import (
+    connect_to_md,
+    load_aws_credentials,
+    register_pyarrow_tables,
+    write_to_local_from_duckdb,
+    write_to_md_from_duckdb,
+    write_to_s3_from_duckdb,
+)
+from models import EcommerceJobParameters, table_partition_columns
+from state import RunManifest
+
+
+def get_destinations(params: EcommerceJobParameters) -> List[str]:
+    """
+    Normalize the destination parameter into a list of destination names.
+
+    Args:
+        params (EcommerceJobParameters): The parameters for the Ecommerce job.
+
+    Returns:
+        List[str]: The destinations, e.g. ["local", "s3", "md"].
+    """
+    if isinstance(params.destination, str):
+        return [d.strip() for d in params.destination.split(",") if d.strip()]
+    return list(params.destination)
+
+
+def init_destination(duckdb_con, destination: str, params: EcommerceJobParameters):
+    """
+    Load credentials or attach databases needed to write to a destination.
+
+    Args:
+        duckdb_con: The DuckDB connection (or cursor) that will write to the destination.
+        destination (str): One of "local", "s3" or "md".
+        params (EcommerceJobParameters): The parameters for the Ecommerce job.
+
+    Returns:
+        None
+    """
+    if destination == "s3":
+        load_aws_credentials(duckdb_con, params.aws_profile)
+    elif destination == "md":
+        connect_to_md(duckdb_con, os.environ["motherduck_token"])
+
+
+def sink_to_destination(
+    duckdb_con,
+    destination: str,
+    table_name: str,
+    params: EcommerceJobParameters,
+    file_suffix: str = "",
+    merge_key: Optional[str] = None,
+):
+    """
+    Write a DuckDB table (or registered view) to a single, initialized destination.
+
+    Args:
+        duckdb_con: The DuckDB connection (or cursor) initialized with ``init_destination``.
+        destination (str): One of "local", "s3" or "md".
+        table_name (str): The name of the table to sink.
+        params (EcommerceJobParameters): The parameters for the Ecommerce job.
+        file_suffix (str, optional): Appended to local and S3 file names. Defaults to "".
+        merge_key (str, optional): Key used to merge rows into MotherDuck. Defaults to None.
+
+    Raises:
+        ValueError: If the destination is unknown.
+
+    Returns:
+        None
+    """
+    if destination == "local":
+        write_to_local_from_duckdb(
+            duckdb_con=duckdb_con,
+            table=table_name,
+            local_path=params.local_path,
+            file_format=params.local_format,
+            file_suffix=file_suffix,
+            partition_column=table_partition_columns.get(table_name),
+            partitioned=params.partitioned,
+            compression=params.parquet_compression,
+            row_group_size=params.parquet_row_group_size,
+            per_thread_output=params.per_thread_output,
+        )
+    elif destination == "s3":
+        write_to_s3_from_duckdb(
+            duckdb_con=duckdb_con,
+            tables=[table_name],
+            s3_path=params.s3_path,
+            file_suffix=file_suffix,
+            partition_columns=table_partition_columns if params.partitioned else None,
+            compression=params.parquet_compression,
+            row_group_size=params.parquet_row_group_size,
+        )
+    elif destination == "md":
+        write_to_md_from_duckdb(
+            duckdb_con=duckdb_con,
+            table=table_name,
+            local_database=duckdb_con.execute("SELECT current_database()").fetchone()[0],
+            remote_database="ecommerce",
+            merge_key=merge_key,
+        )
+    else:
+        raise ValueError(f"Unknown destination: {destination}")
+
+
+def open_destinations(
+    conn,
+    params: EcommerceJobParameters,
+    pyarrow_tables: Optional[dict] = None,
+    initialize: bool = True,
+) -> Dict[str, object]:
+    """
+    Open one DuckDB cursor per destination and initialize each destination once.
+
+    Credentials and attached databases belong to the DuckDB database, so callers
+    opening cursors repeatedly (e.g. once per table) initialize the destinations
+    once on the connection and pass ``initialize=False``.
+
+    Args:
+        conn: The DuckDB connection holding the tables to sink.
+        params (EcommerceJobParameters): The parameters for the Ecommerce job.
+        pyarrow_tables (dict, optional): PyArrow Tables to register as views on every cursor,
+            for tables that were not materialized in DuckDB. Defaults to None.
+        initialize (bool, optional): Whether to run ``init_destination`` on the cursors. Defaults to True.
+
+    Returns:
+        Dict[str, object]: DuckDB cursors keyed by destination name.
+    """
+    cursors = {}
+    for destination in get_destinations(params):
+        cursors[destination] = conn.cursor()
+        if pyarrow_tables:
+            register_pyarrow_tables(cursors[destination], pyarrow_tables)
+        if initialize:
+            init_destination(cursors[destination], destination, params)
+    return cursors
+
+
+def requires_materialization(params: EcommerceJobParameters) -> bool:
+    """
+    Whether tables must be copied into DuckDB storage before sinking.
+
+    File destinations can ``COPY`` straight from registered Arrow views, but
+    the MotherDuck sink reads ``{database}.{table}`` and needs a real table.
+    Model-derived column types also only exist once a table is created.
+
+    Args:
+        params (EcommerceJobParameters): The parameters for the Ecommerce job.
+
+    Returns:
+        bool: True unless zero-copy is enabled and only file destinations are used
+        without a staging database or model-derived column types.
+    """
+    return (
+        not params.zero_copy
+        or params.staging_database is not None
+        or params.duckdb_types != "inferred"
+        or "md" in get_destinations(params)
+    )
+
+
+def sink_tables(
+    cursors: Dict[str, object],
+    table_names: List[str],
+    params: EcommerceJobParameters,
+    sink_options: Optional[Dict[str, dict]] = None,
+    max_workers: int = 3,
+    manifest: Optional[RunManifest] = None,
+    table_sizes: Optional[Dict[str, Tuple[int, int]]] = None,
+):
+    """
+    Write tables to all destinations concurrently.
+
+    Each destination writes the tables in order on its own cursor, so the
+    total sink time is bounded by the slowest destination rather than the sum.
+
+    Args:
+        cursors (Dict[str, object]): Initialized cursors, as returned by ``open_destinations``.
+        table_names (List[str]): The names of the tables to sink.
+        params (EcommerceJobParameters): The parameters for the Ecommerce job.
+        sink_options (Dict[str, dict], optional): Extra ``sink_to_destination`` keyword arguments per table.
+        max_workers (int, optional): Maximum number of destinations written at once. Defaults to 3.
+        manifest (RunManifest, optional): When given, table/destination pairs it marks as done are
+            skipped, and newly written ones are marked. Defaults to None.
+        table_sizes (Dict[str, Tuple[int, int]], optional): Rows and Arrow bytes of each table,
+            recorded as the sink throughput. Tables without an entry have their rows counted
+            in DuckDB and no bytes. Defaults to None.
+
+    Returns:
+        None
+    """
+    sink_options = sink_options or {}
+    table_sizes = table_sizes or {}
+
+    def sink_all(destination, cursor):
+        start_time = time.time()
+        for table_name in table_names:
+            step = f"sink:{destination}"
+            if manifest and manifest.is_done(table_name, step):
+                logger.info(f"Skipping {table_name} to {destination}, already sunk")
+                continue
+            logger.info(f"Sinking {table_name} to {destination}")
+            with track(step, table_name) as metrics:
+                sink_to_destination(
+                    cursor, destination, table_name, params, **sink_options.get(table_name, {})
+                )
+                if table_name in table_sizes:
+                    metrics.rows, metrics.bytes = table_sizes[table_name]
+                else:
+                    metrics.rows = cursor.execute(f"SELECT count(*) FROM {table_name}").fetchone()[0]
+            if manifest:
+                manifest.mark_done(table_name, step)
+        logger.info(
+            f"Sinking {len(table_names)} tables to {destination} took {time.time() - start_time:.2f} seconds"
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(cursors) or 1))) as executor:
+        futures = [
+            executor.submit(sink_all, destination, cursor)
+            for destination, cursor in cursors.items()
+        ]
+        for future in futures:
+            future.result()
+
+
+class QuarantineWriter:
+    """
+    Streams rows rejected by validation, with their error codes, to a Parquet file.
+
+    The file is opened on the first rejected rows, so memory stays bounded by
+    one batch however many rows a stream rejects, and clean tables leave no file.
+    """
+
+    def __init__(self, table_name: str, quarantine_path: Optional[str], run_id: str = ""):
+        """
+        Args:
+            table_name (str): The name of the table the rows belong to.
+            quarantine_path (str, optional): Directory of the quarantine files. None drops the rows.
+            run_id (str, optional): Identifier of the current run, appended to the file name. Defaults to "".
+        """
+        self.table_name = table_name
+        self.quarantine_path = quarantine_path
+        self.path = None
+        if quarantine_path:
+            self.path = os.path.join(
+                quarantine_path, f"{table_name}_{run_id}.parquet" if run_id else f"{table_name}.parquet"
+            )
+        self.rows, self.bytes, self.batches, self.seconds = 0, 0, 0, 0.0
+        self._writer = None
+
+    def write(self, rejected: pa.Table):
+        """
+        Append rejected rows to the quarantine file.
+
+        Args:
+            rejected (pa.Table): Rejected rows as returned by ``split_invalid_rows``.
+        """
+        if rejected.num_rows == 0:
+            return
+        self.rows += rejected.num_rows
+        if not self.quarantine_path:
+            return
+        start_time = time.perf_counter()
+        if self._writer is None:
+            os.makedirs(self.quarantine_path, exist_ok=True)
+            self._writer = pq.ParquetWriter(self.path, rejected.schema, compression="zstd")
+        self._writer.write_table(rejected)
+        self.seconds += time.perf_counter() - start_time
+        self.bytes += rejected.nbytes
+        self.batches += 1
+
+    def close(self) -> Optional[str]:
+        """
+        Close the quarantine file.
+
+        Returns:
+            Optional[str]: The written file, or None if nothing was written.
+        """
+        if self._writer is None:
+            if self.rows:
+                logger.warning(f"Dropping {self.rows} rejected rows of {self.table_name}")
+            return None
+        self._writer.close()
+        self._writer = None
+        record("quarantine", self.table_name, self.seconds, self.rows, self.bytes, self.batches)
+        logger.warning(f"Quarantined {self.rows} rejected rows of {self.table_name} to {self.path}")
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_quarantine(
+    rejected: pa.Table, table_name: str, quarantine_path: Optional[str], run_id: str = ""
+) -> Optional[str]:
+    """
+    Write rows rejected by validation, with their error codes, to a Parquet file.
+
+    Args:
+        rejected (pa.Table): Rejected rows as returned by ``split_invalid_rows``.
+        table_name (str): The name of the table the rows belong to.
+        quarantine_path (str, optional): Directory of the quarantine files. None drops the rows.
+        run_id (str, optional): Identifier of the current run, appended to the file name. Defaults to "".
+
+    Returns:
+        Optional[str]: The written file, or None if nothing was written.
+    """
+    with QuarantineWriter(table_name, quarantine_path, run_id) as quarantine:
+        quarantine.write(rejected)
+    return quarantine.path if quarantine.batches else None
@@ -0,0 +1,179 @@
+""" Helper functions for persisting incremental extraction and run state """
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from loguru import logger
+
+
+def load_watermarks(state_path: str) -> Dict[str, dict]:
+    """
+    Load per-table high-water marks from a local JSON state file.
+
+    Args:
+        state_path (str): Path to the state file.
+
+    Returns:
+        Dict[str, dict]: Watermarks keyed by table name, each holding the
+        watermark ``column`` and its ``value``. Empty if the file does not exist.
+    """
+    if not os.path.exists(state_path):
+        logger.info(f"No state file found at {state_path}, extracting full tables")
+        return {}
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def save_watermarks(state_path: str, watermarks: Dict[str, dict]):
+    """
+    Atomically write per-table high-water marks to a local JSON state file.
+
+    Args:
+        state_path (str): Path to the state file.
+        watermarks (Dict[str, dict]): Watermarks keyed by table name.
+
+    Returns:
+        None
+    """
+    _write_json(state_path, watermarks)
+
+
+def _write_json(path: str, data: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def compute_watermark(
+    data: Union[pa.Table, pa.RecordBatch], column: str
+) -> Optional[Union[int, float, str]]:
+    """
+    Compute the high-water mark of a column as a JSON-serializable value.
+
+    Timestamps are returned as ISO 8601 strings, numbers as-is.
+
+    Args:
+        data (Union[pa.Table, pa.RecordBatch]): The extracted rows.
+        column (str): The watermark column.
+
+    Returns:
+        Optional[Union[int, float, str]]: The maximum value, or None if there are no non-null values.
+    """
+    value = pc.max(data[column]).as_py()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def update_watermark(
+    watermarks: Dict[str, dict],
+    table_name: str,
+    column: str,
+    data: Union[pa.Table, pa.RecordBatch],
+):
+    """
+    Raise a table's watermark to the maximum of ``column`` in ``data``.
+
+    Args:
+        watermarks (Dict[str, dict]): Watermarks keyed by table name, updated in place.
+        table_name (str): The name of the table.
+        column (str): The watermark column.
+        data (Union[pa.Table, pa.RecordBatch]): The extracted rows.
+
+    Returns:
+        None
+    """
+    value = compute_watermark(data, column)
+    if value is None:
+        return
+    current = watermarks.get(table_name)
+    if current is None or current["column"] != column or _greater(value, current["value"]):
+        watermarks[table_name] = {"column": column, "value": value}
+
+
+def _greater(value, current) -> bool:
+    if isinstance(value, str):
+        return datetime.fromisoformat(value) > datetime.fromisoformat(current)
+    return value > current
+
+
+def run_fingerprint(queries: List[str], destinations: List[str]) -> str:
+    """
+    Fingerprint what a run extracts and where it writes, so that a manifest is
+    only resumed by an equivalent run.
+
+    Args:
+        queries (List[str]): The BigQuery queries of the run.
+        destinations (List[str]): The destinations of the run.
+
+    Returns:
+        str: A hex digest.
+    """
+    payload = json.dumps({"queries": queries, "destinations": sorted(destinations)})
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class RunManifest:
+    """
+    Records which steps (extract, validate, load, sink:<destination>) completed
+    for each table of a run, persisted to a JSON file after every step.
+
+    Loading a manifest whose fingerprint matches the current run resumes it,
+    including its run id; otherwise a fresh manifest is started.
+    """
+
+    def __init__(self, path: str, fingerprint: str, run_id: str, steps: Optional[Dict[str, List[str]]] = None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.run_id = run_id
+        self.steps = steps or {}
+        self.resumed = bool(steps)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str, run_id: str) -> "RunManifest":
+        """
+        Load the manifest of an interrupted, equivalent run, or start a new one.
+
+        Args:
+            path (str): Path to the manifest file.
+            fingerprint (str): Fingerprint of the current run, see ``run_fingerprint``.
+            run_id (str): Identifier used if a new manifest is started.
+
+        Returns:
+            RunManifest: The manifest.
+        """
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("fingerprint") == fingerprint:
+                logger.info(f"Resuming run {data['run_id']} from {path}")
+                return cls(path, fingerprint, data["run_id"], data["steps"])
+            logger.warning(f"Ignoring manifest {path} written by a different run")
+        return cls(path, fingerprint, run_id)
+
+    def is_done(self, table_name: str, step: str) -> bool:
+        with self._lock:
+            return step in self.steps.get(table_name, [])
+
+    def mark_done(self, table_name: str, step: str):
+        with self._lock:
+            done = self.steps.setdefault(table_name, [])
+            if step not in done:
+                done.append(step)
+            _write_json(
+                self.path,
+                {"fingerprint": self.fingerprint, "run_id": self.run_id, "steps": self.steps},
+            )
+
+    def complete(self):
+        """Remove the manifest once every step of the run has completed."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
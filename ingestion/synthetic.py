@@ -0,0 +1,165 @@
+""" Synthetic thelook-shaped data and an offline stand-in for the BigQuery client """
+import re
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Type, get_args
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from pydantic import BaseModel
+
+from models import table_model_mapping
+
+# Realistic, low-cardinality values for the categorical thelook columns
+COLUMN_VALUES: Dict[str, list] = {
+    "status": ["Complete", "Shipped", "Processing", "Cancelled", "Returned"],
+    "gender": ["F", "M"],
+    "traffic_source": ["Search", "Organic", "Facebook", "Email", "Display", "YouTube", "Adwords"],
+    "browser": ["Chrome", "Firefox", "Safari", "IE", "Other"],
+    "event_type": ["home", "department", "product", "cart", "purchase", "cancel"],
+    "country": ["United States", "China", "Brasil", "South Korea", "France", "United Kingdom", "Germany", "Spain", "Japan", "Australia"],
+    "state": ["California", "Texas", "Guangdong", "São Paulo", "Île-de-France", "England", "Bayern", "Madrid", "Tokyo", "New South Wales"],
+    "city": ["Los Angeles", "Houston", "Shenzhen", "São Paulo", "Paris", "London", "Munich", "Madrid", "Tokyo", "Sydney"],
+    "category": ["Accessories", "Active", "Blazers & Jackets", "Jeans", "Sweaters", "Swim", "Tops & Tees"],
+    "product_category": ["Accessories", "Active", "Blazers & Jackets", "Jeans", "Sweaters", "Swim", "Tops & Tees"],
+    "department": ["Men", "Women"],
+    "product_department": ["Men", "Women"],
+    "brand": ["Allegra K", "Calvin Klein", "Carhartt", "Levi's", "Nike", "Quiksilver"],
+    "product_brand": ["Allegra K", "Calvin Klein", "Carhartt", "Levi's", "Nike", "Quiksilver"],
+}
+
+# Integer ranges (low, high) for non-key integer columns
+COLUMN_RANGES: Dict[str, tuple] = {
+    "age": (12, 70),
+    "sequence_number": (1, 15),
+    "num_of_item": (1, 4),
+    "distribution_center_id": (1, 10),
+    "product_distribution_center_id": (1, 10),
+}
+
+START_TIMESTAMP = np.datetime64("2019-01-01T00:00:00", "us")
+TIMESTAMP_SPAN_SECONDS = 5 * 365 * 24 * 3600
+NULL_FRACTION = 0.3  # share of nulls in optional lifecycle timestamps (shipped_at, ...)
+
+
+def _base_type(annotation):
+    args = [arg for arg in get_args(annotation) if arg is not type(None)]
+    return args[0] if args else annotation
+
+
+def _column(name: str, kind, start: int, num_rows: int, rng: np.random.Generator) -> pa.Array:
+    ids = np.arange(start, start + num_rows, dtype=np.int64)
+    if kind is int:
+        if name in ("id", "order_id"):
+            return pa.array(ids + 1)
+        low, high = COLUMN_RANGES.get(name, (1, 100_000))
+        return pa.array(rng.integers(low, high + 1, num_rows))
+    if kind is float:
+        if name == "latitude":
+            return pa.array(rng.uniform(-60, 70, num_rows))
+        if name == "longitude":
+            return pa.array(rng.uniform(-180, 180, num_rows))
+        return pa.array(np.round(rng.uniform(0.5, 999, num_rows), 2))
+    if kind is datetime:
+        offsets = rng.integers(0, TIMESTAMP_SPAN_SECONDS, num_rows) * 1_000_000
+        values = pa.array(START_TIMESTAMP + offsets.astype("timedelta64[us]"))
+        values = values.cast(pa.timestamp("us", tz="UTC"))
+        if name != "created_at":
+            mask = pa.array(rng.random(num_rows) < NULL_FRACTION)
+            values = pc.if_else(mask, pa.scalar(None, values.type), values)
+        return values
+    if kind is str:
+        if name in COLUMN_VALUES:
+            vocabulary = pa.array(COLUMN_VALUES[name])
+            return vocabulary.take(pa.array(rng.integers(0, len(vocabulary), num_rows)))
+        return pc.binary_join_element_wise(f"{name}-", pa.array(ids).cast(pa.string()), "")
+    raise TypeError(f"Unsupported column type for synthetic data: {name}: {kind}")
+
+
+def generate_batches(
+    table_name: str,
+    num_rows: int,
+    batch_rows: int = 1_000_000,
+    seed: int = 0,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Generate synthetic rows for a thelook table, batch by batch.
+
+    Columns follow the table's model in ``table_model_mapping``; categorical
+    columns use realistic low-cardinality values. Output is deterministic for
+    a given seed, so runs are comparable across commits.
+
+    Args:
+        table_name (str): The name of the thelook table.
+        num_rows (int): Total number of rows to generate.
+        batch_rows (int, optional): Rows per record batch. Defaults to 1_000_000.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Yields:
+        pa.RecordBatch: Synthetic rows.
+    """
+    model: Type[BaseModel] = table_model_mapping[table_name]
+    rng = np.random.default_rng(seed)
+    for start in range(0, num_rows, batch_rows):
+        size = min(batch_rows, num_rows - start)
+        columns = {
+            name: _column(name, _base_type(field.annotation), start, size, rng)
+            for name, field in model.model_fields.items()
+        }
+        yield pa.RecordBatch.from_pydict(columns)
+
+
+def generate_table(table_name: str, num_rows: int, seed: int = 0) -> pa.Table:
+    """
+    Generate a synthetic thelook table.
+
+    Args:
+        table_name (str): The name of the thelook table.
+        num_rows (int): Number of rows to generate.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        pa.Table: Synthetic rows.
+    """
+    return pa.Table.from_batches(list(generate_batches(table_name, num_rows, seed=seed)))
+
+
+class _SyntheticRowIterator:
+    def __init__(self, table_name: str, num_rows: int, batch_rows: int):
+        self.table_name, self.num_rows, self.batch_rows = table_name, num_rows, batch_rows
+
+    def to_arrow_iterable(self, bqstorage_client=None, max_queue_size=None, **kwargs):
+        return generate_batches(self.table_name, self.num_rows, self.batch_rows)
+
+
+class _SyntheticQueryJob:
+    def __init__(self, table_name: str, num_rows: int, batch_rows: int):
+        self.table_name, self.num_rows, self.batch_rows = table_name, num_rows, batch_rows
+
+    def to_arrow(self, **kwargs) -> pa.Table:
+        return generate_table(self.table_name, self.num_rows)
+
+    def result(self, **kwargs) -> _SyntheticRowIterator:
+        return _SyntheticRowIterator(self.table_name, self.num_rows, self.batch_rows)
+
+
+class SyntheticBigQueryClient:
+    """
+    Offline stand-in for ``bigquery.Client`` serving synthetic data.
+
+    Supports what the extraction functions in ``bigquery.py`` use: ``query()``
+    returning a job with ``to_arrow()`` and ``result().to_arrow_iterable()``.
+    The table name is read from the query's ``FROM`` clause.
+    """
+
+    def __init__(self, num_rows: int, batch_rows: int = 1_000_000, rows_per_table: Optional[Dict[str, int]] = None):
+        self.num_rows = num_rows
+        self.batch_rows = batch_rows
+        self.rows_per_table = rows_per_table or {}
+        self.queries = []
+
+    def query(self, query: str) -> _SyntheticQueryJob:
+        self.queries.append(query)
+        table_name = re.search(r"FROM\s+`[^`]*\.(\w+)`", query).group(1)
+        num_rows = self.rows_per_table.get(table_name, self.num_rows)
+        return _SyntheticQueryJob(table_name, num_rows, self.batch_rows)
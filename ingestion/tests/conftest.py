@@ -0,0 +1,96 @@
+import os
+import re
+import sys
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pytest
+
+# The pipeline modules import their siblings by bare name (they are run as
+# `python ingestion/pipeline.py`), so expose the ingestion folder on sys.path.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeRowIterator:
+    def __init__(self, table: pa.Table):
+        self.table = table
+
+    def to_arrow_iterable(self, bqstorage_client=None, max_queue_size=None):
+        yield from self.table.to_batches(max_chunksize=3)
+
+
+class FakeQueryJob:
+    """Stands in for bigquery.QueryJob, returning a canned PyArrow Table."""
+
+    def __init__(self, table, delay: float, tracker: dict):
+        self.table = table
+        self.delay = delay
+        self.tracker = tracker
+
+    def to_arrow(self, bqstorage_client=None):
+        with self.tracker["lock"]:
+            self.tracker["active"] += 1
+            self.tracker["peak"] = max(self.tracker["peak"], self.tracker["active"])
+        time.sleep(self.delay)
+        with self.tracker["lock"]:
+            self.tracker["active"] -= 1
+        if isinstance(self.table, Exception):
+            raise self.table
+        return self.table
+
+    def result(self):
+        return FakeRowIterator(self.to_arrow())
+
+
+def _shard_filter(table: pa.Table, query: str):
+    """Evaluate the key range predicate ``shard_query`` appends to a query, if any."""
+    first = re.search(r"\((\w+) < (-?\d+) OR \w+ IS NULL\)$", query)
+    if first:
+        keys = table[first.group(1)]
+        return pc.or_kleene(pc.less(keys, int(first.group(2))), pc.is_null(keys))
+    later = re.search(r"(\w+) >= (-?\d+)(?: AND \w+ < (-?\d+))?$", query)
+    if later:
+        keys = table[later.group(1)]
+        keep = pc.greater_equal(keys, int(later.group(2)))
+        if later.group(3) is not None:
+            keep = pc.and_(keep, pc.less(keys, int(later.group(3))))
+        return keep
+    return None
+
+
+class FakeBigQueryClient:
+    """
+    Stands in for bigquery.Client; the table name is the last dotted part of the
+    query. A ``SELECT MIN(column) AS lo, MAX(column) AS hi`` query returns the key
+    range, and the trailing key range predicate of a shard is applied to the result.
+    """
+
+    def __init__(self, results: dict, delays: dict):
+        self.results = results
+        self.delays = delays
+        self.submitted = []
+        self.tracker = {"lock": threading.Lock(), "active": 0, "peak": 0}
+
+    def query(self, query: str):
+        table_name = query.split("`")[1].rsplit(".", 1)[-1]
+        self.submitted.append(query)
+        result = self.results[table_name]
+        key_range = re.match(r"SELECT MIN\((\w+)\) AS lo, MAX\(\w+\) AS hi", query)
+        if key_range:
+            keys = result[key_range.group(1)]
+            result = pa.table({"lo": [pc.min(keys).as_py()], "hi": [pc.max(keys).as_py()]})
+        elif isinstance(result, pa.Table):
+            keep = _shard_filter(result, query)
+            if keep is not None:
+                result = result.filter(keep)
+        return FakeQueryJob(result, self.delays.get(table_name, 0.0), self.tracker)
+
+
+@pytest.fixture
+def make_bigquery_client():
+    def make(results: dict, delays: dict = None):
+        return FakeBigQueryClient(results, delays or {})
+
+    return make
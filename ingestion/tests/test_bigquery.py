@@ -0,0 +1,181 @@
+import json
+import time
+
+import pyarrow as pa
+import pytest
+
+from cache import ResultCache
+from models import EcommerceJobParameters
+from bigquery import (
+    _rebatch,
+    build_ecommerce_query,
+    get_bigquery_results,
+    iter_bigquery_results,
+    shard_query,
+    stream_bigquery_batches,
+    table_columns,
+)
+
+
+def _tables(table_names):
+    return {name: pa.table({"id": [i]}) for i, name in enumerate(table_names)}
+
+
+def _queries(table_names):
+    return [f"SELECT * FROM `dataset.{name}`" for name in table_names]
+
+
+def test_get_bigquery_results_keeps_requested_order(make_bigquery_client):
+    table_names = ["orders", "users", "events"]
+    client = make_bigquery_client(
+        _tables(table_names), {"orders": 0.15, "users": 0.0, "events": 0.05}
+    )
+    tables = get_bigquery_results(_queries(table_names), table_names, client, max_workers=3)
+    assert list(tables) == table_names
+    assert tables["events"]["id"].to_pylist() == [2]
+
+
+def test_iter_bigquery_results_yields_in_completion_order(make_bigquery_client):
+    table_names = ["orders", "users"]
+    client = make_bigquery_client(_tables(table_names), {"orders": 0.2, "users": 0.0})
+    completed = [
+        name
+        for name, _ in iter_bigquery_results(_queries(table_names), table_names, client, max_workers=2)
+    ]
+    assert completed == ["users", "orders"]
+
+
+def test_downloads_are_bounded_and_concurrent(make_bigquery_client):
+    table_names = ["a", "b", "c", "d"]
+    client = make_bigquery_client(_tables(table_names), {name: 0.1 for name in table_names})
+    start = time.time()
+    get_bigquery_results(_queries(table_names), table_names, client, max_workers=2)
+    assert client.tracker["peak"] == 2
+    assert time.time() - start < 0.35
+
+
+def test_download_error_is_raised(make_bigquery_client):
+    table_names = ["orders", "users"]
+    results = _tables(table_names)
+    results["users"] = RuntimeError("boom")
+    client = make_bigquery_client(results)
+    with pytest.raises(RuntimeError, match="boom"):
+        get_bigquery_results(_queries(table_names), table_names, client)
+
+
+def test_rebatch_bounds_batch_size():
+    table = pa.table({"id": list(range(10))})
+    batches = list(_rebatch(table.to_batches(max_chunksize=3), batch_rows=4))
+    assert [batch.num_rows for batch in batches] == [4, 4, 2]
+    assert pa.Table.from_batches(batches)["id"].to_pylist() == list(range(10))
+
+
+def test_rebatch_keeps_schema_of_empty_result():
+    empty = pa.RecordBatch.from_pylist([], schema=pa.schema([("id", pa.int64())]))
+    batches = list(_rebatch([empty], 4))
+    assert len(batches) == 1 and batches[0].num_rows == 0
+
+
+def test_stream_bigquery_batches(make_bigquery_client):
+    client = make_bigquery_client({"events": pa.table({"id": list(range(7))})})
+    batches = list(
+        stream_bigquery_batches(_queries(["events"])[0], "events", client, batch_rows=5)
+    )
+    assert [batch.num_rows for batch in batches] == [5, 2]
+
+
+def test_build_ecommerce_query_filters_above_watermarks():
+    params = EcommerceJobParameters(
+        table_names=["orders", "products", "users"],
+        gcp_project="test_project",
+        s3_path=None,
+        aws_profile=None,
+    )
+    watermarks = {
+        "orders": {"column": "created_at", "value": "2024-01-01T00:00:00+00:00"},
+        "products": {"column": "id", "value": 42},
+    }
+    assert build_ecommerce_query(params, "ds", watermarks) == [
+        'SELECT * FROM `ds.orders` WHERE created_at > TIMESTAMP("2024-01-01T00:00:00+00:00")',
+        "SELECT * FROM `ds.products` WHERE id > 42",
+        "SELECT * FROM `ds.users`",
+    ]
+
+
+def test_build_ecommerce_query_pushes_down_columns_and_filters(tmp_path):
+    config_path = tmp_path / "query_config.json"
+    config_path.write_text(
+        json.dumps(
+            {
+                "columns": {"events": ["user_id", "event_type"]},
+                "filters": {"events": "event_type = 'purchase'", "users": "age >= 18"},
+            }
+        )
+    )
+    params = EcommerceJobParameters(
+        table_names=["events", "users"],
+        gcp_project="test_project",
+        s3_path=None,
+        aws_profile=None,
+        filters={"users": "country = 'Brasil'"},
+        query_config=str(config_path),
+    )
+    watermarks = {"events": {"column": "created_at", "value": "2024-01-01T00:00:00+00:00"}}
+    assert build_ecommerce_query(params, "ds", watermarks) == [
+        "SELECT user_id, event_type, id, created_at FROM `ds.events` "
+        "WHERE (event_type = 'purchase') AND created_at > TIMESTAMP(\"2024-01-01T00:00:00+00:00\")",
+        "SELECT * FROM `ds.users` WHERE (country = 'Brasil')",
+    ]
+
+
+def test_table_columns_from_models():
+    params = EcommerceJobParameters(
+        table_names=["orders"],
+        gcp_project="test_project",
+        s3_path=None,
+        aws_profile=None,
+        model_columns=True,
+    )
+    assert table_columns(params, "orders")[:3] == ["order_id", "user_id", "status"]
+    assert table_columns(params.model_copy(update={"model_columns": False}), "orders") is None
+
+
+def test_shard_query_extends_existing_filter():
+    assert shard_query("SELECT * FROM `ds.events`", "id", 1, (0, 9)) == ["SELECT * FROM `ds.events`"]
+    assert shard_query("SELECT * FROM `ds.events`", "id", 4, None) == ["SELECT * FROM `ds.events`"]
+    assert shard_query("SELECT * FROM `ds.events` WHERE id > 3", "id", 3, (4, 9)) == [
+        "SELECT * FROM `ds.events` WHERE id > 3 AND (id < 6 OR id IS NULL)",
+        "SELECT * FROM `ds.events` WHERE id > 3 AND id >= 6 AND id < 8",
+        "SELECT * FROM `ds.events` WHERE id > 3 AND id >= 8",
+    ]
+
+
+def test_shard_query_caps_shards_at_key_count():
+    assert shard_query("SELECT * FROM `ds.events`", "id", 4, (5, 6)) == [
+        "SELECT * FROM `ds.events` WHERE (id < 6 OR id IS NULL)",
+        "SELECT * FROM `ds.events` WHERE id >= 6",
+    ]
+
+
+def test_sharded_table_is_downloaded_in_parallel_and_reassembled(make_bigquery_client):
+    ids = list(range(-3, 7)) + [None]
+    events = pa.table({"id": ids, "event_type": ["home"] * 11})
+    client = make_bigquery_client({"events": events}, {"events": 0.1})
+
+    results = get_bigquery_results(_queries(["events"]), ["events"], client, max_workers=4, shards={"events": 4})
+
+    assert len(client.submitted) == 5  # the key range, then one query per shard
+    assert client.tracker["peak"] == 4
+    assert results["events"]["id"].to_pylist().count(None) == 1
+    assert sorted(results["events"]["id"].drop_null().to_pylist()) == list(range(-3, 7))
+
+
+def test_cached_results_are_not_queried_again(tmp_path, make_bigquery_client):
+    client = make_bigquery_client(_tables(["a", "b"]))
+    cache = ResultCache(str(tmp_path))
+
+    first = get_bigquery_results(_queries(["a", "b"]), ["a", "b"], client, cache=cache)
+    second = get_bigquery_results(_queries(["a", "b"]), ["a", "b"], client, cache=cache)
+
+    assert len(client.submitted) == 2
+    assert second == first
@@ -0,0 +1,60 @@
+import os
+import time
+
+import pyarrow as pa
+
+from cache import ResultCache
+
+
+def _table(n: int) -> pa.Table:
+    return pa.table({"id": list(range(n))})
+
+
+def test_put_then_get_roundtrip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    assert cache.get("SELECT 1", "users") is None
+
+    cache.put("SELECT 1", _table(3))
+
+    assert cache.get("SELECT 1", "users").equals(_table(3))
+    assert cache.get("SELECT 2", "users") is None
+
+
+def test_expired_entries_are_removed(tmp_path):
+    cache = ResultCache(str(tmp_path), ttl_seconds=60)
+    cache.put("SELECT 1", _table(3))
+    path = cache.path("SELECT 1")
+    os.utime(path, (time.time(), time.time() - 120))
+
+    assert cache.get("SELECT 1", "users") is None
+    assert not os.path.exists(path)
+
+
+def test_least_recently_read_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put("SELECT 1", _table(1000))
+    cache.put("SELECT 2", _table(1000))
+    now = time.time()
+    os.utime(cache.path("SELECT 1"), (now - 10, now))
+    os.utime(cache.path("SELECT 2"), (now - 20, now))
+    entry_size = os.path.getsize(cache.path("SELECT 1"))
+
+    cache.max_bytes = entry_size * 2
+    cache.put("SELECT 3", _table(1000))
+
+    assert not os.path.exists(cache.path("SELECT 2"))
+    assert os.path.exists(cache.path("SELECT 1"))
+    assert os.path.exists(cache.path("SELECT 3"))
+
+
+def test_entry_evicted_during_get_is_a_miss(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path))
+    cache.put("SELECT 1", _table(3))
+
+    def evicted(path):
+        os.remove(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(pa, "memory_map", evicted)
+
+    assert cache.get("SELECT 1", "users") is None
@@ -0,0 +1,34 @@
+import os
+
+import clients
+
+
+class FakeCredentials:
+    pass
+
+
+def test_clients_are_cached_until_credentials_change(tmp_path, monkeypatch):
+    key_file = tmp_path / "key.json"
+    key_file.write_text("{}")
+    loaded = []
+
+    def from_service_account_file(path):
+        loaded.append(path)
+        return FakeCredentials()
+
+    monkeypatch.setenv("GOOGLE_APPLICATION_CREDENTIALS", str(key_file))
+    monkeypatch.setattr(clients.service_account.Credentials, "from_service_account_file", from_service_account_file)
+    monkeypatch.setattr(clients.bigquery, "Client", lambda project, credentials: (project, credentials))
+    clients._load_credentials.cache_clear()
+    clients._bigquery_client.cache_clear()
+
+    first = clients.get_bigquery_client("project")
+    assert clients.get_bigquery_client("project") is first
+    assert clients.get_bigquery_client("other")[1] is first[1]
+    assert loaded == [str(key_file)]
+
+    # A rotated key file is picked up by the next call
+    stat = key_file.stat()
+    os.utime(key_file, (stat.st_atime, stat.st_mtime + 10))
+    assert clients.get_bigquery_client("project") is not first
+    assert len(loaded) == 2
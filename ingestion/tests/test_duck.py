@@ -0,0 +1,177 @@
+from datetime import datetime, timezone
+
+import duckdb
+import pyarrow as pa
+import pytest
+
+from duck import (
+    append_batches_to_duckdb,
+    create_table_from_pyarrow_tables,
+    write_to_local_from_duckdb,
+    write_to_s3_from_duckdb,
+)
+
+
+def _reader(table: pa.Table, chunk_size: int = 2) -> pa.RecordBatchReader:
+    return pa.RecordBatchReader.from_batches(
+        table.schema, iter(table.to_batches(max_chunksize=chunk_size))
+    )
+
+
+def test_create_table_from_pyarrow_tables():
+    conn = duckdb.connect()
+    create_table_from_pyarrow_tables(conn, {"orders": pa.table({"id": [1, 2, 3]})})
+    assert conn.execute("SELECT sum(id) FROM orders").fetchone()[0] == 6
+
+
+def test_append_batches_to_duckdb_creates_then_appends():
+    conn = duckdb.connect()
+    table = pa.table({"id": [1, 2, 3, 4, 5], "status": list("abcde")})
+    append_batches_to_duckdb(conn, "orders", _reader(table))
+    append_batches_to_duckdb(conn, "orders", _reader(table.slice(0, 1)))
+    assert conn.execute("SELECT count(*), sum(id) FROM orders").fetchone() == (6, 16)
+
+
+def _orders_table(months):
+    return pa.table(
+        {
+            "id": list(range(len(months))),
+            "created_at": pa.array(
+                [datetime(2024, month, 1) for month in months], pa.timestamp("us")
+            ),
+        }
+    )
+
+
+def _orders(statuses):
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    n = len(statuses)
+    return pa.table(
+        {
+            "order_id": list(range(n)),
+            "user_id": list(range(n)),
+            "status": statuses,
+            "gender": ["F"] * n,
+            "created_at": [created_at] * n,
+            "returned_at": pa.array([None] * n, type=pa.timestamp("us", tz="UTC")),
+            "shipped_at": [created_at] * n,
+            "delivered_at": [created_at] * n,
+            "num_of_item": [1] * n,
+        }
+    )
+
+
+def test_create_table_with_narrow_model_types():
+    conn = duckdb.connect()
+    create_table_from_pyarrow_tables(
+        conn, {"orders": _orders(["Shipped", "Complete", None])}, column_types="narrow"
+    )
+
+    types = dict(conn.execute("SELECT column_name, data_type FROM information_schema.columns").fetchall())
+    assert types["order_id"] == "INTEGER"
+    assert types["status"] == "ENUM('Complete', 'Shipped')"
+    assert types["gender"] == "ENUM('F')"
+    assert types["created_at"] == "TIMESTAMP WITH TIME ZONE"
+    assert conn.execute("SELECT count(*) FROM orders WHERE status = 'Shipped'").fetchone()[0] == 1
+
+    # Reloading replaces the table and its ENUM types
+    create_table_from_pyarrow_tables(conn, {"orders": _orders(["Returned"])}, column_types="narrow")
+    assert conn.execute("SELECT status FROM orders").fetchall() == [("Returned",)]
+
+
+def test_append_batches_with_model_types_keeps_strings():
+    conn = duckdb.connect()
+    append_batches_to_duckdb(conn, "orders", _reader(_orders(["Shipped", "Complete", "Shipped"])), "narrow")
+
+    types = dict(conn.execute("SELECT column_name, data_type FROM information_schema.columns").fetchall())
+    assert types["num_of_item"] == "INTEGER"
+    assert types["status"] == "VARCHAR"
+    assert conn.execute("SELECT count(*) FROM orders").fetchone()[0] == 3
+
+
+def test_write_to_s3_single_file(tmp_path):
+    conn = duckdb.connect()
+    create_table_from_pyarrow_tables(conn, {"orders": _orders_table([1, 2])})
+    write_to_s3_from_duckdb(conn, ["orders"], str(tmp_path))
+    assert (tmp_path / "orders.parquet").exists()
+
+
+def test_write_to_s3_partitioned_overwrites_touched_partitions_only(tmp_path):
+    conn = duckdb.connect()
+    create_table_from_pyarrow_tables(conn, {"orders": _orders_table([1, 2, 2])})
+    write_to_s3_from_duckdb(
+        conn, ["orders"], str(tmp_path), partition_columns={"orders": "created_at"}
+    )
+    conn.execute("DROP TABLE orders")
+    create_table_from_pyarrow_tables(conn, {"orders": _orders_table([2])})
+    write_to_s3_from_duckdb(
+        conn, ["orders"], str(tmp_path), partition_columns={"orders": "created_at"}
+    )
+
+    files = sorted(p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*.parquet"))
+    assert files == [
+        "orders/year=2024/month=1/data_0.parquet",
+        "orders/year=2024/month=2/data_0.parquet",
+    ]
+    counts = conn.execute(
+        f"""
+        SELECT month, count(*) FROM read_parquet('{tmp_path}/orders/**/*.parquet', hive_partitioning = true)
+        GROUP BY month ORDER BY month
+        """
+    ).fetchall()
+    assert counts == [(1, 1), (2, 1)]
+
+
+def test_write_to_s3_partitioned_removes_stale_files_of_touched_partitions(tmp_path):
+    conn = duckdb.connect()
+    create_table_from_pyarrow_tables(conn, {"orders": _orders_table([1, 2])})
+    write_to_s3_from_duckdb(
+        conn, ["orders"], str(tmp_path), partition_columns={"orders": "created_at"}
+    )
+    # Left behind by an earlier run that wrote more files per partition, and a delta of another run
+    stale = (tmp_path / "orders/year=2024/month=1/data_0.parquet").read_bytes()
+    (tmp_path / "orders/year=2024/month=1/data_1.parquet").write_bytes(stale)
+    (tmp_path / "orders/year=2024/month=2/data_1.parquet").write_bytes(stale)
+    (tmp_path / "orders/year=2024/month=2/data_20240301T000000_0.parquet").write_bytes(stale)
+    conn.execute("DROP TABLE orders")
+    create_table_from_pyarrow_tables(conn, {"orders": _orders_table([2])})
+
+    write_to_s3_from_duckdb(
+        conn, ["orders"], str(tmp_path), partition_columns={"orders": "created_at"}
+    )
+
+    files = sorted(p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*.parquet"))
+    assert files == [
+        "orders/year=2024/month=1/data_0.parquet",
+        "orders/year=2024/month=1/data_1.parquet",
+        "orders/year=2024/month=2/data_0.parquet",
+        "orders/year=2024/month=2/data_20240301T000000_0.parquet",
+    ]
+
+
+@pytest.mark.parametrize("file_format", ["csv", "csv.gz", "csv.zst", "parquet"])
+def test_write_to_local_formats(tmp_path, file_format):
+    conn = duckdb.connect()
+    create_table_from_pyarrow_tables(conn, {"orders": _orders_table([1, 2])})
+
+    write_to_local_from_duckdb(conn, "orders", str(tmp_path / "out"), file_format)
+
+    path = tmp_path / "out" / f"orders.{file_format}"
+    assert conn.execute(f"SELECT count(*) FROM '{path}'").fetchone()[0] == 2
+
+
+def test_write_to_local_per_thread_and_partitioned(tmp_path):
+    conn = duckdb.connect()
+    create_table_from_pyarrow_tables(conn, {"orders": _orders_table([1, 2])})
+
+    (tmp_path / "orders").mkdir()
+    stale = tmp_path / "orders" / "data_99.parquet"
+    conn.execute(f"COPY orders TO '{stale}' (FORMAT PARQUET)")
+    write_to_local_from_duckdb(conn, "orders", str(tmp_path), "parquet", per_thread_output=True)
+    assert not stale.exists()
+    assert conn.execute(f"SELECT count(*) FROM '{tmp_path}/orders/*.parquet'").fetchone()[0] == 2
+
+    write_to_local_from_duckdb(
+        conn, "orders", str(tmp_path / "hive"), "csv.gz", partition_column="created_at", partitioned=True
+    )
+    assert list((tmp_path / "hive" / "orders").glob("year=*/month=*/data_0.csv.gz"))
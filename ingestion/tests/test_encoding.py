@@ -0,0 +1,59 @@
+import pyarrow as pa
+
+from encoding import dictionary_encode_batches, dictionary_encode_table
+
+
+def _events(n: int = 100) -> pa.Table:
+    return pa.table(
+        {
+            "id": list(range(n)),
+            "browser": ["Chrome", "Safari"] * (n // 2),
+            "city": ["Lisbon"] * n,
+            "uri": [f"/product/{i}" for i in range(n)],
+        }
+    )
+
+
+def test_configured_columns_are_encoded_and_reported():
+    table, stats = dictionary_encode_table(_events(), "events", mode="configured")
+
+    assert pa.types.is_dictionary(table["browser"].type)
+    assert table["city"].type == pa.string()
+    assert table["browser"].to_pylist() == _events()["browser"].to_pylist()
+    by_column = {column.column: column for column in stats}
+    assert set(by_column) == {"browser", "city", "uri"}
+    assert by_column["browser"].distinct == 2
+    assert by_column["browser"].encoded_bytes < by_column["browser"].plain_bytes
+    assert by_column["uri"].encoded_bytes is None
+
+
+def test_auto_mode_detects_low_cardinality_columns():
+    table, _ = dictionary_encode_table(_events(), "events", mode="auto", max_ratio=0.05)
+
+    assert pa.types.is_dictionary(table["city"].type)
+    assert table["uri"].type == pa.string()
+
+
+def test_batches_keep_the_columns_chosen_on_the_first_batch():
+    batches = _events(200).to_batches(max_chunksize=100)
+    # The second batch alone would not qualify for auto encoding
+    second = pa.Table.from_batches([batches[1]])
+    second = second.set_column(2, "city", pa.array([str(i) for i in range(100)]))
+    batches[1] = second.to_batches()[0]
+
+    encoded = list(dictionary_encode_batches(iter(batches), "events", mode="auto", max_ratio=0.05))
+
+    assert [batch.schema for batch in encoded] == [encoded[0].schema] * 2
+    assert pa.types.is_dictionary(encoded[0].schema.field("city").type)
+
+
+def test_auto_mode_skips_wide_columns():
+    referrers = pa.array([f"https://example.com/{i % 2}" * 4 for i in range(100)])
+    events = _events().append_column("referrer", referrers)
+
+    table, stats = dictionary_encode_table(events, "events", mode="auto", max_ratio=0.05)
+
+    assert table["referrer"].type == pa.string()
+    by_column = {column.column: column for column in stats}
+    assert by_column["referrer"].distinct is None
+    assert by_column["city"].distinct == 1
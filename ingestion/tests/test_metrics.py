@@ -0,0 +1,40 @@
+import json
+
+import metrics
+
+
+def test_track_is_a_noop_without_a_run():
+    with metrics.track("extract", "orders") as stage:
+        stage.rows = 3
+    assert metrics.finish_run() is None
+
+
+def test_run_report_collects_stages(tmp_path):
+    report_path = tmp_path / "report.json"
+    metrics.start_run("20240101T000000")
+    with metrics.track("extract", "orders") as stage:
+        stage.rows, stage.bytes, stage.batches = 10, 80, 1
+    metrics.record("validate", "orders", 0.5, rows=10)
+
+    report = metrics.finish_run(str(report_path))
+
+    assert [(s.table, s.stage) for s in report.stages] == [
+        ("orders", "extract"),
+        ("orders", "validate"),
+    ]
+    assert report.stages[0].wall_seconds >= 0 and report.stages[0].process_peak_rss_bytes > 0
+    written = json.loads(report_path.read_text())
+    assert written["run_id"] == "20240101T000000"
+    assert written["stages"][1]["wall_seconds"] == 0.5
+
+
+def test_track_records_the_memory_a_stage_retains():
+    metrics.start_run("20240101T000000")
+    with metrics.track("load", "orders"):
+        retained = bytearray(64 * 2**20)
+        retained[::4096] = b"x" * len(retained[::4096])
+
+    (stage,) = metrics.finish_run().stages
+    assert stage.rss_delta_bytes >= 32 * 2**20
+    assert stage.process_peak_rss_bytes >= stage.rss_delta_bytes
+    del retained
@@ -0,0 +1,303 @@
+import json
+from datetime import datetime, timezone
+
+import duckdb
+import pyarrow as pa
+import pytest
+
+import pipeline
+import sink
+from models import EcommerceJobParameters, TableValidationError
+from sink import get_destinations
+from synthetic import generate_table
+
+
+@pytest.fixture(autouse=True)
+def no_storage_client(monkeypatch):
+    monkeypatch.setattr(pipeline, "get_bigquery_storage_client", lambda: None)
+
+
+@pytest.fixture
+def users_table():
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return pa.table(
+        {
+            "id": list(range(10)),
+            "first_name": ["Ada"] * 10,
+            "last_name": ["Lovelace"] * 10,
+            "email": ["ada@example.com"] * 10,
+            "age": [36] * 10,
+            "gender": ["F"] * 10,
+            "state": ["London"] * 10,
+            "street_address": ["1 Street"] * 10,
+            "postal_code": ["N1"] * 10,
+            "city": ["London"] * 10,
+            "country": ["UK"] * 10,
+            "latitude": [51.5] * 10,
+            "longitude": [-0.1] * 10,
+            "traffic_source": ["Search"] * 10,
+            "created_at": [created_at] * 10,
+        }
+    )
+
+
+@pytest.fixture
+def params():
+    return EcommerceJobParameters(
+        table_names=["users"],
+        gcp_project="test_project",
+        destination=["local"],
+        s3_path=None,
+        aws_profile=None,
+        streaming=True,
+        stream_batch_rows=4,
+    )
+
+
+def test_get_destinations_splits_strings(params):
+    params.destination = "local, s3"
+    assert get_destinations(params) == ["local", "s3"]
+
+
+def test_stream_tables_copies_straight_to_local_sink(
+    tmp_path, monkeypatch, make_bigquery_client, users_table, params
+):
+    monkeypatch.chdir(tmp_path)
+    client = make_bigquery_client({"users": users_table})
+    conn = duckdb.connect()
+
+    pipeline.stream_tables(conn, ["SELECT * FROM `dataset.users`"], params, client)
+
+    rows = duckdb.sql(f"SELECT count(*) FROM '{tmp_path / 'users.csv'}'").fetchone()[0]
+    assert rows == users_table.num_rows
+    assert "users" not in [t[0] for t in conn.execute("SHOW TABLES").fetchall()]
+
+
+def test_incremental_main_writes_delta_after_first_run(
+    tmp_path, monkeypatch, make_bigquery_client, users_table, params
+):
+    monkeypatch.chdir(tmp_path)
+    client = make_bigquery_client({"users": users_table})
+    monkeypatch.setattr(pipeline, "get_bigquery_client", lambda project_name: client)
+    params.streaming = False
+    params.incremental = True
+    params.state_path = str(tmp_path / "state.json")
+
+    pipeline.main(params)
+    assert (tmp_path / "users.csv").exists()
+    assert "WHERE" not in client.submitted[-1]
+
+    pipeline.main(params)
+    assert 'WHERE created_at > TIMESTAMP("2024-01-01T00:00:00+00:00")' in client.submitted[-1]
+    assert len(list(tmp_path.glob("users_*.csv"))) == 1
+
+
+def test_zero_copy_main_sinks_from_arrow_views(
+    tmp_path, monkeypatch, make_bigquery_client, users_table, params
+):
+    monkeypatch.chdir(tmp_path)
+    client = make_bigquery_client({"users": users_table})
+    monkeypatch.setattr(pipeline, "get_bigquery_client", lambda project_name: client)
+    conn = duckdb.connect()
+    monkeypatch.setattr(pipeline.duckdb, "connect", lambda *args: conn)
+    params.streaming = False
+    params.zero_copy = True
+
+    pipeline.main(params)
+
+    assert conn.execute("SELECT count(*) FROM duckdb_tables()").fetchone()[0] == 0
+    rows = duckdb.sql(f"SELECT count(*) FROM '{tmp_path / 'users.csv'}'").fetchone()[0]
+    assert rows == users_table.num_rows
+
+
+def test_main_writes_run_report(tmp_path, monkeypatch, make_bigquery_client, users_table, params):
+    monkeypatch.chdir(tmp_path)
+    client = make_bigquery_client({"users": users_table})
+    monkeypatch.setattr(pipeline, "get_bigquery_client", lambda project_name: client)
+    params.streaming = False
+    params.report_path = str(tmp_path / "report.json")
+
+    pipeline.main(params)
+
+    report = json.loads((tmp_path / "report.json").read_text())
+    stages = {(s["table"], s["stage"]): s for s in report["stages"]}
+    assert set(stages) == {
+        ("users", "extract"),
+        ("users", "validate"),
+        ("users", "load"),
+        ("users", "sink:local"),
+    }
+    assert stages[("users", "extract")]["rows"] == users_table.num_rows
+    assert stages[("users", "sink:local")]["rows"] == users_table.num_rows
+    assert stages[("users", "sink:local")]["bytes"] > 0
+
+
+def test_staged_main_resumes_after_failed_sink(
+    tmp_path, monkeypatch, make_bigquery_client, users_table, params
+):
+    monkeypatch.chdir(tmp_path)
+    client = make_bigquery_client({"users": users_table})
+    monkeypatch.setattr(pipeline, "get_bigquery_client", lambda project_name: client)
+    params.streaming = False
+    params.staging_database = str(tmp_path / "staging.duckdb")
+
+    def failing_sink(*args, **kwargs):
+        raise RuntimeError("sink unavailable")
+
+    with monkeypatch.context() as m:
+        m.setattr(sink, "sink_to_destination", failing_sink)
+        with pytest.raises(RuntimeError):
+            pipeline.main(params)
+    assert (tmp_path / "staging.duckdb.manifest.json").exists()
+    submitted = len(client.submitted)
+
+    pipeline.main(params)
+
+    assert len(client.submitted) == submitted
+    rows = duckdb.sql(f"SELECT count(*) FROM '{tmp_path / 'users.csv'}'").fetchone()[0]
+    assert rows == users_table.num_rows
+    assert not (tmp_path / "staging.duckdb.manifest.json").exists()
+
+
+def test_streaming_main_ignores_staging_database(
+    tmp_path, monkeypatch, make_bigquery_client, users_table, params
+):
+    monkeypatch.chdir(tmp_path)
+    client = make_bigquery_client({"users": users_table})
+    monkeypatch.setattr(pipeline, "get_bigquery_client", lambda project_name: client)
+    params.streaming = True
+    params.destination = "local,s3"
+    params.staging_database = str(tmp_path / "staging.duckdb")
+    monkeypatch.setattr(sink, "init_destination", lambda *args: None)
+    monkeypatch.setattr(sink, "write_to_s3_from_duckdb", lambda *args, **kwargs: None)
+
+    def failing_local(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(sink, "write_to_local_from_duckdb", failing_local)
+        with pytest.raises(RuntimeError):
+            pipeline.main(params)
+
+    pipeline.main(params)
+
+    assert not (tmp_path / "staging.duckdb").exists()
+    rows = duckdb.sql(f"SELECT count(*) FROM '{tmp_path / 'users.csv'}'").fetchone()[0]
+    assert rows == users_table.num_rows
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_main_quarantines_rejected_rows(
+    tmp_path, monkeypatch, make_bigquery_client, users_table, params, streaming
+):
+    monkeypatch.chdir(tmp_path)
+    ages = pa.array(["36", "36", "36", "old", "36", "36", "36", "old", "36", "36"])
+    bad_users = users_table.set_column(4, "age", ages)
+    client = make_bigquery_client({"users": bad_users})
+    monkeypatch.setattr(pipeline, "get_bigquery_client", lambda project_name: client)
+    params.streaming = streaming
+    params.quarantine_path = str(tmp_path / "quarantine")
+
+    pipeline.main(params)
+
+    rows = duckdb.sql(f"SELECT count(*) FROM '{tmp_path / 'users.csv'}'").fetchone()[0]
+    assert rows == 8
+    (quarantined,) = (tmp_path / "quarantine").glob("users_*.parquet")
+    rejected = duckdb.sql(
+        f"SELECT _row_index, _error_codes FROM '{quarantined}' ORDER BY _row_index"
+    ).fetchall()
+    assert rejected == [(3, "int_parsing"), (7, "int_parsing")]
+
+
+def test_streaming_fail_fast_keeps_previous_watermark(
+    tmp_path, monkeypatch, make_bigquery_client, users_table, params
+):
+    monkeypatch.chdir(tmp_path)
+    ages = pa.array(["36", "36", "36", "36", "36", "36", "36", "old", "36", "36"])
+    bad_users = users_table.set_column(4, "age", ages)
+    client = make_bigquery_client({"users": bad_users})
+    monkeypatch.setattr(pipeline, "get_bigquery_client", lambda project_name: client)
+    params.incremental = True
+    params.validation_fail_fast = True
+    params.state_path = str(tmp_path / "state.json")
+    watermark = {"users": {"column": "created_at", "value": "2023-12-31T00:00:00+00:00"}}
+    (tmp_path / "state.json").write_text(json.dumps(watermark))
+
+    with pytest.raises(TableValidationError):
+        pipeline.main(params)
+
+    assert json.loads((tmp_path / "state.json").read_text()) == watermark
+
+
+def test_main_reports_dictionary_encoded_columns(
+    tmp_path, monkeypatch, make_bigquery_client, users_table, params
+):
+    monkeypatch.chdir(tmp_path)
+    client = make_bigquery_client({"users": users_table})
+    monkeypatch.setattr(pipeline, "get_bigquery_client", lambda project_name: client)
+    params.streaming = False
+    params.dictionary_encode = "configured"
+    params.report_path = str(tmp_path / "report.json")
+
+    pipeline.main(params)
+
+    columns = {c["column"]: c for c in json.loads((tmp_path / "report.json").read_text())["columns"]}
+    assert columns["country"]["distinct"] == 1
+    assert columns["country"]["encoded_bytes"] is not None
+    assert columns["email"]["encoded_bytes"] is None
+    rows = duckdb.sql(f"SELECT count(*) FROM '{tmp_path / 'users.csv'}' WHERE country = 'UK'").fetchone()[0]
+    assert rows == users_table.num_rows
+
+
+def test_pipelined_main_sinks_fast_tables_while_slow_ones_download(
+    tmp_path, monkeypatch, make_bigquery_client, users_table, params
+):
+    monkeypatch.chdir(tmp_path)
+    products = generate_table("products", 2)
+    client = make_bigquery_client({"users": users_table, "products": products}, {"users": 0.5})
+    monkeypatch.setattr(pipeline, "get_bigquery_client", lambda project_name: client)
+    params.streaming = False
+    params.pipelined = True
+    params.table_names = ["users", "products"]
+    params.incremental = True
+    params.state_path = str(tmp_path / "state.json")
+
+    sunk = []
+    sink_to_destination = sink.sink_to_destination
+
+    def recording_sink(duckdb_con, destination, table_name, *args, **kwargs):
+        sunk.append((table_name, client.tracker["active"]))
+        return sink_to_destination(duckdb_con, destination, table_name, *args, **kwargs)
+
+    monkeypatch.setattr(sink, "sink_to_destination", recording_sink)
+    initialized = []
+    for module in (pipeline, sink):
+        monkeypatch.setattr(
+            module, "init_destination", lambda con, destination, params: initialized.append(destination)
+        )
+
+    pipeline.main(params)
+
+    # products was written while users was still downloading
+    assert sunk == [("products", 1), ("users", 0)]
+    assert initialized == ["local"]
+    assert (tmp_path / "users.csv").exists() and (tmp_path / "products.csv").exists()
+    state = json.loads((tmp_path / "state.json").read_text())
+    assert set(state) == {"users", "products"}
+
+
+def test_streaming_run_report_has_sink_throughput(
+    tmp_path, monkeypatch, make_bigquery_client, users_table, params
+):
+    monkeypatch.chdir(tmp_path)
+    client = make_bigquery_client({"users": users_table})
+    monkeypatch.setattr(pipeline, "get_bigquery_client", lambda project_name: client)
+    params.streaming = True
+    params.report_path = str(tmp_path / "report.json")
+
+    pipeline.main(params)
+
+    report = json.loads((tmp_path / "report.json").read_text())
+    (sink_stage,) = [s for s in report["stages"] if s["stage"] == "sink:local"]
+    assert sink_stage["rows"] == users_table.num_rows
+    assert sink_stage["bytes"] > 0
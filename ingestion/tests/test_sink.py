@@ -0,0 +1,89 @@
+import time
+
+import duckdb
+import pyarrow as pa
+import pytest
+
+import sink
+from models import EcommerceJobParameters
+
+
+@pytest.fixture
+def params():
+    return EcommerceJobParameters(
+        table_names=["orders", "users"],
+        gcp_project="test_project",
+        destination=["local", "s3", "md"],
+        s3_path="s3://bucket/path",
+        aws_profile="test_profile",
+    )
+
+
+@pytest.fixture
+def conn():
+    conn = duckdb.connect()
+    conn.register("orders_arrow", pa.table({"id": [1, 2]}))
+    conn.execute("CREATE TABLE orders AS SELECT * FROM orders_arrow")
+    conn.execute("CREATE TABLE users AS SELECT * FROM orders_arrow")
+    return conn
+
+
+def test_sink_tables_writes_local_csv(tmp_path, monkeypatch, conn, params):
+    monkeypatch.chdir(tmp_path)
+    params.destination = ["local"]
+    sink.sink_tables(sink.open_destinations(conn, params), params.table_names, params)
+    assert (tmp_path / "orders.csv").exists() and (tmp_path / "users.csv").exists()
+
+
+def test_destinations_are_initialized_once_and_written_concurrently(
+    monkeypatch, conn, params
+):
+    initialized, written = [], []
+
+    def fake_init(duckdb_con, destination, params):
+        initialized.append(destination)
+
+    def fake_sink(duckdb_con, destination, table_name, params, **options):
+        time.sleep(0.1)
+        written.append((destination, table_name, options))
+
+    monkeypatch.setattr(sink, "init_destination", fake_init)
+    monkeypatch.setattr(sink, "sink_to_destination", fake_sink)
+
+    start = time.time()
+    sink.sink_tables(
+        sink.open_destinations(conn, params),
+        params.table_names,
+        params,
+        {"users": {"file_suffix": "_run"}},
+    )
+    elapsed = time.time() - start
+
+    assert sorted(initialized) == ["local", "md", "s3"]
+    assert len(written) == 6
+    assert ("s3", "users", {"file_suffix": "_run"}) in written
+    assert elapsed < 0.45  # 3 destinations x 2 tables x 0.1s when serial
+
+
+def test_sink_errors_are_raised(monkeypatch, conn, params):
+    params.destination = ["local"]
+
+    def failing_sink(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(sink, "sink_to_destination", failing_sink)
+    with pytest.raises(RuntimeError, match="disk full"):
+        sink.sink_tables(sink.open_destinations(conn, params), params.table_names, params)
+
+
+def test_quarantine_writer_streams_batches_to_one_file(tmp_path):
+    quarantine = sink.QuarantineWriter("users", str(tmp_path / "quarantine"), "run1")
+    assert not (tmp_path / "quarantine").exists()
+
+    with quarantine:
+        quarantine.write(pa.table({"id": [1], "_row_index": pa.array([3], pa.uint64())}))
+        quarantine.write(pa.table({"id": [2], "_row_index": pa.array([7], pa.uint64())}))
+
+    assert quarantine.path == str(tmp_path / "quarantine" / "users_run1.parquet")
+    rows = duckdb.sql(f"SELECT id, _row_index FROM '{quarantine.path}' ORDER BY id").fetchall()
+    assert rows == [(1, 3), (2, 7)]
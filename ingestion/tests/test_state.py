@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+
+import pyarrow as pa
+
+from state import (
+    RunManifest,
+    compute_watermark,
+    load_watermarks,
+    run_fingerprint,
+    save_watermarks,
+    update_watermark,
+)
+
+
+def test_load_watermarks_without_state_file(tmp_path):
+    assert load_watermarks(str(tmp_path / "missing.json")) == {}
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    state_path = str(tmp_path / "state.json")
+    watermarks = {"orders": {"column": "created_at", "value": "2024-01-01T00:00:00+00:00"}}
+    save_watermarks(state_path, watermarks)
+    assert load_watermarks(state_path) == watermarks
+
+
+def test_compute_watermark_serializes_timestamps():
+    table = pa.table(
+        {
+            "created_at": pa.array(
+                [datetime(2024, 1, 2, tzinfo=timezone.utc), None], pa.timestamp("us", tz="UTC")
+            ),
+            "id": [3, 7],
+        }
+    )
+    assert compute_watermark(table, "created_at") == "2024-01-02T00:00:00+00:00"
+    assert compute_watermark(table, "id") == 7
+
+
+def test_update_watermark_only_moves_forward():
+    watermarks = {}
+    update_watermark(watermarks, "products", "id", pa.table({"id": [5, 9]}))
+    update_watermark(watermarks, "products", "id", pa.table({"id": [2]}))
+    update_watermark(watermarks, "products", "id", pa.table({"id": pa.array([None], pa.int64())}))
+    assert watermarks == {"products": {"column": "id", "value": 9}}
+
+
+def test_run_manifest_resumes_only_matching_fingerprint(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    fingerprint = run_fingerprint(["SELECT 1"], ["local"])
+
+    manifest = RunManifest.load(path, fingerprint, "run-1")
+    manifest.mark_done("users", "load")
+
+    resumed = RunManifest.load(path, fingerprint, "run-2")
+    assert resumed.resumed and resumed.run_id == "run-1"
+    assert resumed.is_done("users", "load")
+    assert not resumed.is_done("users", "sink:local")
+
+    other = RunManifest.load(path, run_fingerprint(["SELECT 2"], ["local"]), "run-3")
+    assert not other.resumed and other.run_id == "run-3"
+
+    resumed.complete()
+    assert not (tmp_path / "manifest.json").exists()
@@ -0,0 +1,39 @@
+import pyarrow as pa
+import pytest
+
+from benchmark import run_stage
+from bigquery import get_bigquery_results
+from models import table_model_mapping, validate_table
+from synthetic import SyntheticBigQueryClient, generate_batches, generate_table
+
+
+@pytest.mark.parametrize("table_name", sorted(table_model_mapping))
+def test_generated_tables_match_their_models(table_name):
+    table = generate_table(table_name, 1_000)
+    assert table.column_names == list(table_model_mapping[table_name].model_fields)
+    validate_table(table, table_name)
+
+
+def test_generation_is_deterministic_and_batched():
+    batches = list(generate_batches("orders", 2_500, batch_rows=1_000))
+    assert [batch.num_rows for batch in batches] == [1_000, 1_000, 500]
+    assert pa.Table.from_batches(batches).equals(
+        pa.Table.from_batches(list(generate_batches("orders", 2_500, batch_rows=1_000)))
+    )
+
+
+def test_synthetic_client_serves_get_bigquery_results():
+    client = SyntheticBigQueryClient(100, rows_per_table={"users": 10})
+    tables = get_bigquery_results(
+        ["SELECT * FROM `ds.orders`", "SELECT * FROM `ds.users` WHERE id > 3"],
+        ["orders", "users"],
+        client,
+    )
+    assert tables["orders"].num_rows == 100 and tables["users"].num_rows == 10
+
+
+@pytest.mark.parametrize("stage", ["validate", "sink_parquet"])
+def test_run_stage_reports_throughput(stage):
+    result = run_stage(stage, "order_items", 1_000, 500)
+    assert result.rows == 1_000 and result.rows_per_second > 0
+    assert result.peak_rss_bytes >= result.setup_peak_rss_bytes
@@ -0,0 +1,197 @@
+from datetime import datetime, timezone
+from typing import Literal, Optional
+
+import pyarrow as pa
+import pytest
+
+import ingestion.models as models
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from ingestion.models import (
+    Orders,
+    TableValidationError,
+    ValidationPolicy,
+    collect_validation_errors,
+    derive_column_rules,
+    find_failing_rows,
+    find_invalid_rows,
+    split_invalid_rows,
+    validate_table,
+)
+
+
+class Address(BaseModel):
+    city: str
+    zip_code: Optional[str] = None
+
+
+class Customer(BaseModel):
+    id: int = Field(ge=1)
+    status: Literal["active", "churned"]
+    score: Optional[float] = None
+    address: Optional[Address] = None
+
+
+@pytest.fixture
+def orders_table():
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return pa.table(
+        {
+            "order_id": [1, 2, 3],
+            "user_id": [10, None, 30],
+            "status": ["Complete", "Shipped", None],
+            "gender": ["F", "M", "F"],
+            "created_at": [created_at, created_at, None],
+            "returned_at": pa.array([None, None, None], type=pa.timestamp("us")),
+            "shipped_at": [created_at, None, None],
+            "delivered_at": [created_at, None, None],
+            "num_of_item": [1, 2, 3],
+        }
+    )
+
+
+def test_derive_column_rules():
+    rules = derive_column_rules(Customer)
+    assert rules["id"].kind == "int" and rules["id"].ge == 1
+    assert not rules["id"].nullable
+    assert rules["status"].allowed == ["active", "churned"]
+    assert rules["score"].nullable and not rules["score"].required
+    assert rules["address"].kind == "model"
+    assert set(rules["address"].children) == {"city", "zip_code"}
+
+
+def test_clean_table_flags_no_rows(orders_table):
+    assert len(find_invalid_rows(orders_table, derive_column_rules(Orders))) == 0
+    validate_table(orders_table, "orders")
+
+
+def test_find_invalid_rows_flags_ranges_enums_and_nulls():
+    table = pa.table(
+        {
+            "id": [1, 0, 3, None],
+            "status": ["active", "active", "unknown", "churned"],
+            "score": [0.5, None, 1.0, 2.0],
+        }
+    )
+    suspects = find_invalid_rows(table, derive_column_rules(Customer))
+    assert suspects.to_pylist() == [1, 2, 3]
+
+
+def test_nested_struct_children_are_checked():
+    table = pa.table(
+        {
+            "id": [1, 2, 3],
+            "status": ["active", "active", "churned"],
+            "address": [{"city": "Paris", "zip_code": None}, {"city": None, "zip_code": "1"}, None],
+        }
+    )
+    suspects = find_invalid_rows(table, derive_column_rules(Customer))
+    assert suspects.to_pylist() == [1]
+
+
+def test_incompatible_column_falls_back_to_pydantic():
+    table = pa.table({"id": ["1", "x"], "status": ["active", "churned"]})
+    assert find_invalid_rows(table, derive_column_rules(Customer)).to_pylist() == [0, 1]
+    errors = collect_validation_errors(table, Customer)
+    assert len(errors) == 1 and errors[0].startswith("Row 1 failed validation")
+
+
+def test_validate_table_reports_global_row_indices(orders_table):
+    bad = orders_table.set_column(
+        0, "order_id", pa.array(["1", "2", "three"])
+    )
+    with pytest.raises(TableValidationError, match="Row 2 failed validation"):
+        validate_table(bad, "orders")
+
+
+def test_validate_table_with_projected_columns(orders_table):
+    projected = orders_table.select(["order_id", "created_at"])
+    with pytest.raises(TableValidationError):
+        validate_table(projected, "orders")
+    validate_table(projected, "orders", columns=["order_id", "created_at"])
+
+
+def test_parallel_fallback_matches_serial(monkeypatch):
+    monkeypatch.setattr(models, "FALLBACK_BATCH_SIZE", 2)
+    table = pa.table(
+        {
+            "id": [1, 0, 2, -1, 3, 0, 4],
+            "status": ["active", "active", "gone", "churned", "active", "churned", "active"],
+        }
+    )
+    serial = collect_validation_errors(table, Customer, row_offset=100)
+    parallel = collect_validation_errors(table, Customer, row_offset=100, workers=2)
+
+    assert parallel == serial
+    assert [error.split(" failed")[0] for error in parallel] == [
+        "Row 101", "Row 102", "Row 103", "Row 105"
+    ]
+
+
+def test_split_invalid_rows_bounds_error_messages(orders_table):
+    bad = orders_table.set_column(0, "order_id", pa.array(["x", "2", "y"]))
+    valid, rejected = split_invalid_rows(
+        bad, "orders", row_offset=10, policy=ValidationPolicy(max_errors=1)
+    )
+
+    assert valid["order_id"].to_pylist() == ["2"]
+    assert rejected["_row_index"].to_pylist() == [10, 12]
+    assert rejected["_error_codes"].to_pylist() == ["int_parsing", "int_parsing"]
+    assert rejected["_error_message"][0].as_py() is not None
+    assert rejected["_error_message"][1].as_py() is None
+
+    with pytest.raises(TableValidationError, match="Row 10 failed validation"):
+        split_invalid_rows(bad, "orders", row_offset=10, policy=ValidationPolicy(fail_fast=True))
+    with pytest.raises(TableValidationError, match="1 more failing rows not shown"):
+        validate_table(bad, "orders", policy=ValidationPolicy(max_errors=1))
+
+
+def test_split_invalid_rows_returns_clean_tables_uncopied(orders_table):
+    valid, rejected = split_invalid_rows(orders_table, "orders")
+
+    assert valid is orders_table
+    assert rejected.num_rows == 0
+
+
+class Account(BaseModel):
+    id: int
+    code: str = Field(max_length=3)
+    email: str
+    balance: float
+
+    @field_validator("email")
+    @classmethod
+    def check_email(cls, value):
+        if "@" not in value:
+            raise ValueError("not an email")
+        return value
+
+
+class Transfer(BaseModel):
+    source: int
+    target: int
+
+    @model_validator(mode="after")
+    def check_accounts(self):
+        if self.source == self.target:
+            raise ValueError("same account")
+        return self
+
+
+def test_unsupported_constraints_and_validators_fall_back_to_pydantic():
+    rules = derive_column_rules(Account)
+    assert rules["code"].kind is None and rules["email"].kind is None
+    assert rules["id"].kind == "int"
+
+    table = pa.table(
+        {
+            "id": [1, 2, 3],
+            "code": ["abc", "abcd", "xyz"],
+            "email": ["a@b", "c@d", "nope"],
+            "balance": [1.0, 2.0, 3.0],
+        }
+    )
+    assert [i for i, _, _ in find_failing_rows(table, Account)] == [1, 2]
+
+    transfers = pa.table({"source": [1, 2], "target": [2, 2]})
+    assert [i for i, _, _ in find_failing_rows(transfers, Transfer)] == [1]
@@ -1,7 +1,8 @@
 {% macro format_date_key(date_column) %}
-    CONCAT(
-        CAST(EXTRACT(YEAR FROM {{ date_column }}) AS VARCHAR), 
-        LPAD(CAST(EXTRACT(MONTH FROM {{ date_column }}) AS VARCHAR), 2, '0'), 
-        LPAD(CAST(EXTRACT(DAY FROM {{ date_column }}) AS VARCHAR), 2, '0')
-    )
+    -- Integer YYYYMMDD key, e.g. 20240131
+    CAST(
+        EXTRACT(YEAR FROM {{ date_column }}) * 10000
+        + EXTRACT(MONTH FROM {{ date_column }}) * 100
+        + EXTRACT(DAY FROM {{ date_column }})
+    AS INTEGER)
 {% endmacro %}
@@ -0,0 +1,32 @@
+{% macro incremental_watermark(column) %}
+  {#- Highest value of a column (or expression) in the existing model table, read at compile
+      time so that filters on it are constants DuckDB can use to prune files and row groups -#}
+  {%- if execute and is_incremental() -%}
+    {%- set result = run_query("select max(" ~ column ~ ") from " ~ this) -%}
+    {{ return(result.columns[0].values()[0]) }}
+  {%- endif -%}
+  {{ return(none) }}
+{% endmacro %}
+
+{% macro change_timestamp(columns) %}
+  {#- Latest of the timestamps a row is written with; greatest() skips NULLs -#}
+  {%- if columns is string -%}
+    {{ return(columns) }}
+  {%- endif -%}
+  {{ return("greatest(" ~ columns | join(", ") ~ ")") }}
+{% endmacro %}
+
+{% macro incremental_source_filter(columns='created_at') %}
+  {#- Keep only rows created or updated since the last run. Pass every timestamp a row
+      changes with (e.g. shipped_at, returned_at) so updated rows are reprocessed. Rows are
+      hive-partitioned by created_at, so the year/month predicate that skips older partition
+      folders is only added when filtering on created_at alone -#}
+  {%- set change = change_timestamp(columns) -%}
+  {%- set watermark = incremental_watermark(change) -%}
+  {%- if watermark is not none %}
+    where {{ change }} >= timestamp '{{ watermark }}'
+    {%- if change == 'created_at' and env_var('TRANSFORM_S3_HIVE_PARTITIONING', 'false') == 'true' %}
+      and (year > {{ watermark.year }} or (year = {{ watermark.year }} and month >= {{ watermark.month }}))
+    {%- endif %}
+  {%- endif %}
+{% endmacro %}
@@ -0,0 +1,34 @@
+-- models/agg_customer_sales.sql
+-- One row per customer with their sales, for the customer marts
+
+{{ config(
+    schema='gold',
+    materialized='table'
+) }}
+
+WITH fact_order_items AS (
+    SELECT
+        user_id,
+        sale_price
+    FROM {{ ref('fact_order_items') }}
+),
+dim_users AS (
+    SELECT
+        user_id,
+        gender,
+        country,
+        state
+    FROM {{ ref('dim_users') }}
+)
+SELECT
+    foi.user_id,
+    du.gender,
+    du.country,
+    du.state,
+    -- False for users missing from dim_users
+    du.user_id IS NOT NULL AS is_known_user,
+    COUNT(*) AS item_count,
+    SUM(foi.sale_price) AS total_revenue
+FROM fact_order_items foi
+LEFT JOIN dim_users du ON foi.user_id = du.user_id
+GROUP BY ALL
@@ -0,0 +1,33 @@
+-- models/agg_daily_category_sales.sql
+-- Daily rollup of fact_order_items by product category, read by the category sales mart.
+
+{{ config(
+    schema='gold',
+    materialized='table'
+) }}
+
+WITH fact_order_items AS (
+    SELECT
+        product_id,
+        sale_price,
+        num_of_item,
+        order_date_key
+    FROM {{ ref('fact_order_items') }}
+),
+dim_products AS (
+    SELECT
+        product_id,
+        category
+    FROM {{ ref('dim_products') }}
+)
+SELECT
+    foi.order_date_key,
+    dp.category,
+    -- False for order items whose product is missing from dim_products
+    dp.product_id IS NOT NULL AS is_known_product,
+    COUNT(*) AS item_count,
+    SUM(foi.sale_price) AS total_revenue,
+    SUM(foi.num_of_item) AS total_items_sold
+FROM fact_order_items foi
+LEFT JOIN dim_products dp ON foi.product_id = dp.product_id
+GROUP BY ALL
@@ -0,0 +1,50 @@
+-- models/agg_daily_sales.sql
+-- Daily rollup of fact_order_items by customer location and status. The revenue, country,
+-- state, status and shipping marts are projections of it instead of fact table scans.
+
+{{ config(
+    schema='gold',
+    materialized='table'
+) }}
+
+WITH fact_order_items AS (
+    SELECT
+        user_id,
+        status,
+        sale_price,
+        num_of_item,
+        order_date_key,
+        shipped_date_key
+    FROM {{ ref('fact_order_items') }}
+),
+dim_users AS (
+    SELECT
+        user_id,
+        country,
+        state
+    FROM {{ ref('dim_users') }}
+),
+dim_date AS (
+    SELECT
+        date_key,
+        date
+    FROM {{ ref('dim_date') }}
+)
+SELECT
+    foi.order_date_key,
+    du.country,
+    du.state,
+    -- False for order items whose user is missing from dim_users
+    du.user_id IS NOT NULL AS is_known_user,
+    foi.status,
+    COUNT(*) AS item_count,
+    SUM(foi.sale_price) AS total_revenue,
+    SUM(foi.num_of_item) AS total_items_sold,
+    -- Additive parts of the average time to ship
+    COUNT(dd_shipped.date - dd_order.date) AS shipped_item_count,
+    SUM(dd_shipped.date - dd_order.date) AS total_ship_days
+FROM fact_order_items foi
+LEFT JOIN dim_users du ON foi.user_id = du.user_id
+LEFT JOIN dim_date dd_order ON foi.order_date_key = dd_order.date_key
+LEFT JOIN dim_date dd_shipped ON foi.shipped_date_key = dd_shipped.date_key
+GROUP BY ALL
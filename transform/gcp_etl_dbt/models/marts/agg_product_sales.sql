@@ -0,0 +1,16 @@
+-- models/agg_product_sales.sql
+-- Order item sales per product, read by the top selling products mart. It is the only
+-- rollup kept at product grain.
+
+{{ config(
+    schema='gold',
+    materialized='table'
+) }}
+
+SELECT
+    product_id,
+    COUNT(*) AS item_count,
+    SUM(sale_price) AS total_revenue,
+    SUM(num_of_item) AS total_items_sold
+FROM {{ ref('fact_order_items') }}
+GROUP BY product_id
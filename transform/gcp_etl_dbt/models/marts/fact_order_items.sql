@@ -1,8 +1,12 @@
 {{ config(
     schema='gold',
-    materialized='table'
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='order_item_id'
 ) }}
 
+{%- set last_change_date_key = incremental_watermark(change_timestamp(['order_date_key', 'shipped_date_key', 'delivered_date_key', 'returned_date_key'])) %}
+
 WITH order_items AS (
     SELECT * FROM {{ ref('stg_order_items') }}
 ),
@@ -25,6 +29,11 @@ order_facts AS (
     FROM order_items oi
     JOIN {{ ref('dim_products') }} p ON oi.product_id = p.product_id    
     JOIN {{ ref('dim_orders') }} o ON oi.order_id = o.order_id
+    {%- if last_change_date_key is not none %}
+    -- Rebuild only the items of orders placed, shipped, delivered or returned on or after the last loaded day
+    WHERE {{ change_timestamp(['o.created_at', 'o.shipped_at', 'o.delivered_at', 'o.returned_at']) }}
+        >= strptime('{{ last_change_date_key }}', '%Y%m%d')
+    {%- endif %}
 )
 
 SELECT
@@ -5,13 +5,8 @@
     materialized='view'
 ) }}
 
-WITH fact_order_items AS (
-    SELECT 
-        status
-    FROM {{ ref('fact_order_items') }}
-)
 SELECT 
     status,
-    COUNT(*) AS order_count
-FROM fact_order_items
+    SUM(item_count) AS order_count
+FROM {{ ref('agg_daily_sales') }}
 GROUP BY status
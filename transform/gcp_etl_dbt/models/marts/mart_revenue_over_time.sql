@@ -4,17 +4,12 @@
 ) }}
 
 
-WITH fact_order_items AS (
+WITH daily_revenue AS (
     SELECT 
-        order_id,
-        user_id,
-        product_id,
         order_date_key,
-        sale_price,
-        num_of_item,
-        status,
-        shipped_date_key
-    FROM {{ ref('fact_order_items') }}
+        SUM(total_revenue) AS total_revenue
+    FROM {{ ref('agg_daily_sales') }}
+    GROUP BY order_date_key
 ),
 dim_date AS (
     SELECT 
@@ -24,8 +19,7 @@ dim_date AS (
 )
 SELECT 
     dd.date,
-    SUM(foi.sale_price) AS total_revenue
-FROM fact_order_items foi
-JOIN dim_date dd ON foi.order_date_key = dd.date_key
-GROUP BY dd.date
+    dr.total_revenue
+FROM daily_revenue dr
+JOIN dim_date dd ON dr.order_date_key = dd.date_key
 ORDER BY dd.date
@@ -0,0 +1,14 @@
+-- models/sales_by_state.sql
+
+{{ config(
+    schema='gold',
+    materialized='view'
+) }}
+
+SELECT 
+    state,
+    SUM(total_revenue) AS total_sales
+FROM {{ ref('agg_daily_sales') }}
+WHERE country = 'United States'
+GROUP BY state
+ORDER BY total_sales DESC
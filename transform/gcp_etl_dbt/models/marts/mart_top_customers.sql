@@ -5,16 +5,9 @@
     materialized='view'
 ) }}
 
-WITH fact_order_items AS (
-    SELECT 
-        user_id,
-        sale_price
-    FROM {{ ref('fact_order_items') }}
-)
 SELECT 
     user_id,
-    SUM(sale_price) AS total_revenue
-FROM fact_order_items
-GROUP BY user_id
+    total_revenue
+FROM {{ ref('agg_customer_sales') }}
 ORDER BY total_revenue DESC
-LIMIT 10
\ No newline at end of file
+LIMIT 10
@@ -5,12 +5,11 @@
     materialized='view'
 ) }}
 
-WITH fact_order_items AS (
+WITH agg_product_sales AS (
     SELECT 
-        order_id,
         product_id,
-        num_of_item
-    FROM {{ ref('fact_order_items') }}
+        total_items_sold
+    FROM {{ ref('agg_product_sales') }}
 ),
 dim_products AS (
     SELECT 
@@ -20,9 +19,9 @@ dim_products AS (
 )
 SELECT 
     dp.name AS product_name,
-    SUM(foi.num_of_item) AS total_items_sold
-FROM fact_order_items foi
-JOIN dim_products dp ON foi.product_id = dp.product_id
+    SUM(aps.total_items_sold) AS total_items_sold
+FROM agg_product_sales aps
+JOIN dim_products dp ON aps.product_id = dp.product_id
 GROUP BY dp.name
 ORDER BY total_items_sold DESC
 LIMIT 10
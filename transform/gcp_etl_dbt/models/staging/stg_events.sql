@@ -1,4 +1,8 @@
-{{ config(materialized='table' )}}
+{{ config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='event_id'
+) }}
 
 with stg_events as (
     select 
@@ -17,6 +21,7 @@ with stg_events as (
         cast(event_type as string) as event_type
     
     from {{ source('ecommerce', 'events' ) }}
+    {{ incremental_source_filter('created_at') }}
 )
 
 select * from stg_events
\ No newline at end of file
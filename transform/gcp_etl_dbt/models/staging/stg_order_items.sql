@@ -1,4 +1,8 @@
-{{ config(materialized='table' )}}
+{{ config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='order_item_id'
+) }}
 
 with stg_order_items as (
     select 
@@ -15,6 +19,7 @@ with stg_order_items as (
         cast(sale_price as float) as sale_price
         
     from {{ source('ecommerce', 'order_items' ) }}
+    {{ incremental_source_filter(['created_at', 'shipped_at', 'delivered_at', 'returned_at']) }}
 )
 
 select * from stg_order_items
\ No newline at end of file
@@ -1,4 +1,8 @@
-{{ config(materialized='table' )}}
+{{ config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='order_id'
+) }}
 
 with stg_orders as (
     select 
@@ -13,6 +17,7 @@ with stg_orders as (
         cast(num_of_item as int) as num_of_item
 
     from {{ source('ecommerce', 'orders' ) }}
+    {{ incremental_source_filter(['created_at', 'shipped_at', 'delivered_at', 'returned_at']) }}
 )
 
 select * from stg_orders
\ No newline at end of file